@@ -24,7 +24,11 @@ def parse_action_args(args):
             raise RuntimeError("--nactions wrong format!")
 
 
-def select_action(args, action_out):
+def select_action(args, action_out, action_mask=None):
+    '''
+    action_mask: optional bool array (nagents, naction) of the legal env
+    actions, the illegal ones of the first head are never sampled.
+    '''
     if args.continuous:
         action_mean, _, action_std = action_out
         action = torch.normal(action_mean, action_std)
@@ -32,6 +36,9 @@ def select_action(args, action_out):
     else:
         log_p_a = action_out
         p_a = [[z.exp() for z in x] for x in log_p_a]
+        if action_mask is not None:
+            legal = torch.as_tensor(action_mask, dtype=torch.bool)
+            p_a[0] = [z.masked_fill(~legal, 0) for z in p_a[0]]
         ret = torch.stack([torch.stack([torch.multinomial(x, 1).detach() for x in p]) for p in p_a])
         return ret
 
@@ -339,7 +339,12 @@ class CommNetMLP(nn.Module):
             action = (action_mean, action_log_std, action_std)
         else:
             # discrete actions
-            action = [F.log_softmax(head(h), dim=-1) for head in self.heads]
+            logits = [head(h) for head in self.heads]
+            if info.get('action_mask') is not None:
+                # illegal env actions get no probability mass
+                legal = torch.as_tensor(info['action_mask'], dtype=torch.bool)
+                logits[0] = logits[0].masked_fill(~legal, -1e9)
+            action = [F.log_softmax(logit, dim=-1) for logit in logits]
 
         if self.args.recurrent:
             return action, value_head, value_global, (hidden_state.clone(), cell_state.clone()), node, edge#, grid , auto_res
@@ -3,33 +3,52 @@ import gym
 import ic3net_envs
 from env_wrappers import *
 
+# gym ids of the predator prey variants
+PREDATOR_PREY_VARIANTS = {
+    'predator_prey': 'PredatorPrey-v0',
+    'predator_prey_basic_obstacle': 'PredatorPreyBasicObstacle-v0',
+    'predator_prey_nomask': 'PredatorPreyNoMask-v0',
+    'predator_prey_norml': 'PredatorPreyNorml-v0',
+    'predator_prey_moving_prey': 'PredatorPreyMovingPrey-v0',
+    'predator_prey_moving_mase': 'PredatorPreyMovingMase-v0',
+    'predator_prey_lastusage': 'PredatorPreyLastUsage-v0',
+}
+
+# envs with a snapshot() of their state, the ones --record_episodes can record
+RECORDABLE = set(PREDATOR_PREY_VARIANTS) | {'vec_predator_prey', 'traffic_junction'}
+
 def init(env_name, args, final_init=True):
     print(env_name)
+    if args.record_episodes and env_name not in RECORDABLE:
+        raise RuntimeError("--record_episodes is not supported for " + env_name)
     if env_name == 'levers':
         env = gym.make('Levers-v0')
-        env.multi_agent_init(args.total_agents, args.nagents)
-        env = GymWrapper(env)
+        env.multi_agent_init(args)
+        env = GymWrapper(env, record_path=args.record_episodes)
     elif env_name == 'number_pairs':
         env = gym.make('NumberPairs-v0')
-        m = args.max_message
-        env.multi_agent_init(args.nagents, m)
-        env = GymWrapper(env)
-    elif env_name == 'predator_prey':
-        env = gym.make('PredatorPrey-v0')
-        if args.display:
+        env.multi_agent_init(args)
+        env = GymWrapper(env, record_path=args.record_episodes)
+    elif env_name in PREDATOR_PREY_VARIANTS:
+        env = gym.make(PREDATOR_PREY_VARIANTS[env_name])
+        if args.display and not args.record_episodes:
             env.init_curses()
         env.multi_agent_init(args)
-        env = GymWrapper(env)
+        env = GymWrapper(env, record_path=args.record_episodes)
+    elif env_name == 'vec_predator_prey':
+        # the Trainer rolls out one episode at a time from unbatched state
+        raise RuntimeError("vec_predator_prey steps --nenvs episodes at once and can not be trained "
+                           "with the Trainer, use gym.make('VecPredatorPrey-v0') directly")
     elif env_name == 'traffic_junction':
         env = gym.make('TrafficJunction-v0')
-        if args.display:
+        if args.display and not args.record_episodes:
             env.init_curses()
         env.multi_agent_init(args)
-        env = GymWrapper(env)
+        env = GymWrapper(env, record_path=args.record_episodes)
     elif env_name == 'starcraft':
         env = gym.make('StarCraftWrapper-v0')
         env.multi_agent_init(args, final_init)
-        env = GymWrapper(env.env)
+        env = GymWrapper(env.env, record_path=args.record_episodes)
 
     else:
         raise RuntimeError("wrong env name")
@@ -3,13 +3,18 @@ import numpy as np
 import torch
 from gym import spaces
 from inspect import getargspec
+from ic3net_envs.episode_recorder import EpisodeRecorder
 
 class GymWrapper(object):
     '''
     for multi-agent
     '''
-    def __init__(self, env):
+    def __init__(self, env, record_path=None):
         self.env = env
+        # display() queues env snapshots to this file instead of drawing
+        self.record_path = record_path
+        self.recorder = None
+        self.episode_start = False
 
     @property
     def observation_dim(self):
@@ -29,6 +34,11 @@ class GymWrapper(object):
         else:
             return int(np.prod(self.env.observation_space.shape))
 
+    @property
+    def observation_shape(self):
+        # per agent, the full map, the vision square crop or the entity list
+        return tuple(self.env.observation_space.shape)
+
     @property
     def num_actions(self):
         if hasattr(self.env.action_space, 'nvec'):
@@ -53,23 +63,47 @@ class GymWrapper(object):
     def action_space(self):
         return self.env.action_space
 
+    @property
+    def nenvs(self):
+        # number of episodes stepped together by a vectorized env
+        return getattr(self.env, 'nenvs', 1)
+
     def reset(self, epoch):
         reset_args = getargspec(self.env.reset).args
         if 'epoch' in reset_args:
             obs = self.env.reset(epoch)
         else:
             obs = self.env.reset()
+        self.episode_start = True
 
         #obs = self._flatten_obs(obs) #for conv
-        obs = np.expand_dims(obs, 0)
-        obs = torch.from_numpy(obs).double()
+        if self.nenvs == 1:
+            obs = np.expand_dims(obs, 0)
+        # envs write obs into buffers they reuse, the tensor gets its own copy
+        obs = torch.tensor(obs, dtype=torch.double)
         return obs
 
-    def display(self):
+    def seed(self, seed):
+        # envs without a seed() keep drawing from the global numpy stream
+        if hasattr(self.env, 'seed'):
+            self.env.seed(seed)
+
+    def display(self, comm=None, reward=None):
+        if self.record_path:
+            if self.recorder is None:
+                # started on first use, only the env that displays gets a writer process
+                self.recorder = EpisodeRecorder(self.record_path)
+            self.recorder.record(self.env.snapshot(), comm, reward, self.episode_start)
+            self.episode_start = False
+            return
         self.env.render()
         time.sleep(0.5)
 
     def end_display(self):
+        if self.record_path:
+            if self.recorder is not None:
+                self.recorder.close()
+            return
         self.env.exit_render()
 
     def step(self, action):
@@ -81,6 +115,20 @@ class GymWrapper(object):
         obs = self._flatten_obs(obs)
         return (obs, r, done, info)
 
+    def get_state(self, state=None):
+        # see PredatorPreyEnv.get_state, refills state when given
+        return self.env.get_state(state)
+
+    def set_state(self, state):
+        # the observation of the restored step, shaped as the ones of step()
+        return self._flatten_obs(self.env.set_state(state))
+
+    def action_mask(self):
+        # legal actions of the current obs, None for envs without masks
+        if hasattr(self.env, 'action_mask'):
+            return self.env.action_mask()
+        return None
+
     def reward_terminal(self):
         if hasattr(self.env, 'reward_terminal'):
             return self.env.reward_terminal()
@@ -88,6 +136,9 @@ class GymWrapper(object):
             return np.zeros(1)
 
     def _flatten_obs(self, obs):
+        # envs writing their obs into one (nagents, observation_dim) array,
+        # like the traffic junction, are only reshaped below; tuples of
+        # per agent parts are flattened first
         if isinstance(obs, tuple):
             _obs=[]
             for agent in obs: #list/tuple of observations.
@@ -97,9 +148,13 @@ class GymWrapper(object):
                 _obs.append(np.concatenate(ag_obs))
             obs = np.stack(_obs)
 
-        obs = obs.reshape(1, -1, self.observation_dim)
-        obs = np.expand_dims(obs, 0)
-        obs = torch.from_numpy(obs).double()
+        if self.nenvs > 1:
+            obs = obs.reshape(self.nenvs, -1, self.observation_dim)
+        else:
+            obs = obs.reshape(1, -1, self.observation_dim)
+            obs = np.expand_dims(obs, 0)
+        # the one copy, out of the buffer the env rewrites next step
+        obs = torch.tensor(obs, dtype=torch.double)
         return obs
 
     def get_stat(self):
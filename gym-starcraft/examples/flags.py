@@ -9,6 +9,12 @@ def get_parser():
                         help='Number of enemies')
     parser.add_argument('--torchcraft_dir', type=str, default='~/TorchCraft',
                         help='TorchCraft directory')
+    parser.add_argument('--simulator', type=str, default='torchcraft',
+                        help='torchcraft|local, local runs the micro simulator of ' +
+                        'gym_starcraft.local_torchcraft instead of StarCraft')
+    parser.add_argument('--pipelined', action='store_true', default=False,
+                        help='Send the commands of both players at once and skip the ' +
+                        'frames of a step on the server')
     parser.add_argument('--bwapi_launcher_path', type=str,
                         default='../bwapi/bin/BWAPILauncher',
                         help='Path to BWAPILauncher')
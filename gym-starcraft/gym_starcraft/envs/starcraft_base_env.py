@@ -1,6 +1,6 @@
 import gym
 
-import torchcraft.Constants as tcc
+from gym_starcraft.local_torchcraft import tcc
 import random
 import yaml
 import subprocess
@@ -40,9 +40,12 @@ class StarCraftBaseEnv(gym.Env):
         if not self.final_init:
             return
 
-        options = self.load_config_options()
-
-        self.start_torchcraft(options)
+        if self.simulator == 'local':
+            # both players are clients of one in-process game, see init_conn
+            self.server_port1 = self.server_port2 = None
+        else:
+            options = self.load_config_options()
+            self.start_torchcraft(options)
 
         self.episodes = 0
         self.episode_wins = 0
@@ -94,7 +97,12 @@ class StarCraftBaseEnv(gym.Env):
             # Number of our agents
             'nagents': 1,
             # Number of enemy agents
-            'nenemies': 1
+            'nenemies': 1,
+            # torchcraft | local: the game in gym_starcraft.local_torchcraft
+            'simulator': 'torchcraft',
+            # Send the commands of both players before waiting for either
+            # and skip the frames of a step on the server
+            'pipelined': False
         }
 
         if kwargs is None:
@@ -113,6 +121,8 @@ class StarCraftBaseEnv(gym.Env):
         self.print_summary = kwargs['print_summary']
         self.nagents = kwargs['nagents']
         self.nenemies = kwargs['nenemies']
+        self.simulator = kwargs['simulator']
+        self.pipelined = kwargs['pipelined']
 
     def load_config_options(self):
         """Load config options from config file and environment"""
@@ -186,14 +196,21 @@ class StarCraftBaseEnv(gym.Env):
 
     def init_conn(self):
         """Init connection with torchcraft server"""
-        # Import torchcraft in this function so that torchcraft is not an explicit
-        # dependency for projects importing this repo
-        import torchcraft as tc
-        self.client1 = tc.Client()
+        if self.simulator == 'local':
+            from gym_starcraft.local_torchcraft import Client, LocalGame
+            game = LocalGame()
+            self.client1 = Client(game)
+            self.client2 = Client(game)
+        else:
+            # Import torchcraft in this function so that torchcraft is not an explicit
+            # dependency for projects importing this repo
+            import torchcraft as tc
+            self.client1 = tc.Client()
+            self.client2 = tc.Client()
+
         self.client1.connect(self.server_ip, self.server_port1)
         self.state1 = self.client1.init()
 
-        self.client2 = tc.Client()
         self.client2.connect(self.server_ip, self.server_port2)
         self.state2 = self.client2.init()
 
@@ -201,14 +218,33 @@ class StarCraftBaseEnv(gym.Env):
                  [tcc.set_speed, self.speed],
                  [tcc.set_gui, self.set_gui],
                  # NOTE: We use custom frameskip method now
-                 # Skip frame below
+                 # Skip frame below, pipelined steps set their own in _exchange
                  [tcc.set_frameskip, 1],
                  [tcc.set_cmd_optim, 1]]
 
-        self.client1.send(setup)
-        self.state1 = self.client1.recv()
-        self.client2.send(setup)
-        self.state2 = self.client2.recv()
+        self.server_frameskip = 1
+        self._exchange(setup, setup)
+
+    def _exchange(self, cmds1, cmds2, frames=1):
+        """Sends the commands of both players and receives both states.
+        When pipelined both requests are sent before waiting for either reply,
+        so the two round trips overlap, and the server plays the given number
+        of frames for them. Any other exchange plays one frame.
+        """
+        if self.pipelined:
+            if frames != self.server_frameskip:
+                setup = [[tcc.set_frameskip, frames]]
+                cmds1, cmds2 = setup + list(cmds1), setup + list(cmds2)
+                self.server_frameskip = frames
+            self.client1.send(cmds1)
+            self.client2.send(cmds2)
+            self.state1 = self.client1.recv()
+            self.state2 = self.client2.recv()
+        else:
+            self.client1.send(cmds1)
+            self.state1 = self.client1.recv()
+            self.client2.send(cmds2)
+            self.state2 = self.client2.recv()
 
     def __del__(self):
         if hasattr(self, 'client') and self.client1:
@@ -295,34 +331,37 @@ class StarCraftBaseEnv(gym.Env):
         self.episode_steps += 1
 
         cmds = self._make_commands(action)
-        self.client1.send(cmds)
-        self.state1 = self.client1.recv()
-
         enemy_cmds = self._get_enemy_commands()
 
-        self.client2.send(enemy_cmds)
-        self.state2 = self.client2.recv()
+        start = time.perf_counter()
 
-        self._skip_frames()
+        # Pipelined, the server skips the frames of the step in this exchange
+        if self.pipelined:
+            self._exchange(cmds, enemy_cmds, frames=self.frame_skip + 1)
+        else:
+            self._exchange(cmds, enemy_cmds)
+            self._skip_frames()
 
         while not self._has_step_completed():
             self._skip_frames(1)
+        round_trip = time.perf_counter() - start
 
         self.obs = self._make_observation()
         reward = self._compute_reward()
         done = self._check_done()
         info = self._get_info()
 
+        # Seconds spent waiting for the game in this step and in the episode
+        info['round_trip'] = round_trip
+        self.stat['round_trip'] = self.stat.get('round_trip', 0) + round_trip
+
         self._update_stat()
         self.obs_pre = self.obs
         return self.obs, reward, done, info
 
     def _empty_step(self):
         """Make an empty step where we don't send anything to server"""
-        self.client1.send([])
-        self.state1 = self.client1.recv()
-        self.client2.send([])
-        self.state2 = self.client2.recv()
+        self._exchange([], [])
 
     def _skip_frames(self, skips=-1):
         if skips == -1:
@@ -377,11 +416,7 @@ class StarCraftBaseEnv(gym.Env):
             c1units = self.state1.units[self.state1.player_id]
             c2units = self.state2.units[self.state2.player_id]
 
-            self.client1.send(self.kill_units(c1units))
-            self.state1 = self.client1.recv()
-
-            self.client2.send(self.kill_units(c2units))
-            self.state2 = self.client2.recv()
+            self._exchange(self.kill_units(c1units), self.kill_units(c2units))
 
             for _ in range(10):
                 self._empty_step()
@@ -392,8 +427,9 @@ class StarCraftBaseEnv(gym.Env):
         episodes = self.episodes
 
         if self.print_summary:
-            print("Episodes: %4d | Wins: %4d | WinRate: %1.3f" % (
-                    episodes, wins, wins / (episodes + 1E-6)))
+            round_trip = self.stat.get('round_trip', 0) / max(self.episode_steps, 1)
+            print("Episodes: %4d | Wins: %4d | WinRate: %1.3f | Round trip: %.2f ms" % (
+                    episodes, wins, wins / (episodes + 1E-6), round_trip * 1000))
 
         self.episodes += 1
         self.episode_steps = 0
@@ -416,10 +452,7 @@ class StarCraftBaseEnv(gym.Env):
             c2 += self._get_create_units_command(self.state2.player_id, unit_pair)
 
         # Send commands to both clients
-        self.client1.send(c1)
-        self.state1 = self.client1.recv()
-        self.client2.send(c2)
-        self.state2 = self.client2.recv()
+        self._exchange(c1, c2)
 
         # Wait for units to appear on the map
         while len(self.state1.units.get(self.state1.player_id, [])) == 0 \
@@ -1,8 +1,7 @@
 import numpy as np
 from gym import spaces
 
-import torchcraft.Constants as tcc
-import gym_starcraft.utils as utils
+from gym_starcraft.local_torchcraft import tcc
 import gym_starcraft.envs.starcraft_mvn as sc
 import random
 
@@ -113,53 +112,18 @@ class StarCraftExplore(sc.StarCraftMvN):
 
 
     def _make_observation(self):
-        myself = None
-        enemy = None
-
+        self._refresh_units()
+        me = self.my_units
 
         full_obs = np.zeros((self.nagents,) + self.observation_space.shape)
-
-        for idx in range(self.nagents):
-            agent_id = self.agent_ids[idx]
-
-            if agent_id in self.my_current_units:
-                myself = self.my_current_units[agent_id]
-            else:
-                myself = None
-
-            if myself is None:
-                continue
-
-            curr_obs = full_obs[idx]
-            curr_obs[0] = myself.x / self.state1.map_size[0]
-            curr_obs[1] = myself.y / self.state1.map_size[1]
-
-            for enemy_idx in range(self.nenemies):
-                enemy_id = self.enemy_ids[enemy_idx]
-                if enemy_id in self.enemy_current_units:
-                    enemy = self.enemy_current_units[enemy_id]
-                else:
-                    enemy = None
-
-                if enemy is None:
-                    continue
-
-                if (myself.attacking or myself.starting_attack) and \
-                    self.prev_actions[idx] == enemy_idx + len(self.move_steps):
-                    self.attack_map[idx][enemy_idx] = 1
-
-                distance = utils.get_distance(myself.x, myself.y, enemy.x, enemy.y)
-
-                obs_idx = 2 + enemy_idx * 3
-
-                if distance <= self.vision or self.full_vision:
-                    curr_obs[obs_idx] = (myself.x - enemy.x) / (self.vision)
-                    curr_obs[obs_idx + 1] = (myself.y - enemy.y) / (self.vision)
-                    curr_obs[obs_idx + 2] = 0
-                else:
-                    curr_obs[obs_idx] = 0
-                    curr_obs[obs_idx + 1] = 0
-                    curr_obs[obs_idx + 2] = 1
+        full_obs[:, 0] = me['x'] / self.state1.map_size[0]
+        full_obs[:, 1] = me['y'] / self.state1.map_size[1]
+
+        pair, dx, dy, in_vision = self._enemy_offsets()
+        enemy_obs = full_obs[:, 2:].reshape(self.nagents, self.nenemies, 3)
+        enemy_obs[..., 0] = np.where(in_vision, dx / self.vision, 0)
+        enemy_obs[..., 1] = np.where(in_vision, dy / self.vision, 0)
+        enemy_obs[..., 2] = pair & ~in_vision
         return full_obs
 
     def _get_enemy_commands(self):
@@ -189,34 +153,17 @@ class StarCraftExplore(sc.StarCraftMvN):
 
 
     def _compute_reward(self):
-        reward = np.zeros(self.nagents)
-
-        enemy_id = self.enemy_ids[0]
-        enemy = self.enemy_current_units[enemy_id]
-
-        for idx in range(self.nagents):
-            if self.agent_ids[idx] not in self.my_current_units:
-                continue
-
-            unit = self.my_current_units[self.agent_ids[idx]]
+        alive = self.my_units['alive']
+        enemy = self.enemy_units[0]
 
-            dist = utils.get_distance(unit.x, unit.y, enemy.x, enemy.y)
+        # dead agents keep their last near_enemy
+        dist = np.hypot(self.my_units['x'] - enemy['x'], self.my_units['y'] - enemy['y'])
+        self.near_enemy[alive] = (enemy['alive'] & (dist <= self.vision))[alive]
 
-            if dist <= self.vision:
-                self.near_enemy[idx] = 1
-            else:
-                self.near_enemy[idx] = 0
-
-        for idx in range(self.nagents):
-            if self.agent_ids[idx] not in self.my_current_units:
-                continue
-
-            if self.near_enemy[idx] == 1:
-                reward[idx] += self.ONPREY_REWARD * (np.count_nonzero(self.near_enemy) ** self.prey_exponent)
-            else:
-                reward[idx] += self.TIMESTEP_PENALTY
-
-        return reward
+        near = np.count_nonzero(self.near_enemy)
+        on_prey = self.ONPREY_REWARD * (max(near, 1) ** self.prey_exponent)
+        reward = np.where(self.near_enemy == 1, on_prey, self.TIMESTEP_PENALTY)
+        return np.where(alive, reward, 0.)
 
     def reward_terminal(self):
         reward = np.zeros(self.nagents)
@@ -7,7 +7,7 @@ import numpy as np
 
 from gym import spaces
 
-import torchcraft.Constants as tcc
+from gym_starcraft.local_torchcraft import tcc
 import gym_starcraft.utils as utils
 import gym_starcraft.envs.starcraft_base_env as sc
 
@@ -16,6 +16,11 @@ import gym_starcraft.envs.starcraft_base_env as sc
 # So, distance factor must be considered during initialization
 DISTANCE_FACTOR = 8
 
+# Fields of a unit read by the observations and the rewards, health is health
+# plus shield and attacking is set while the unit attacks or starts to
+UNIT_DTYPE = np.dtype([('alive', bool), ('x', float), ('y', float), ('hp', float), ('max_hp', float),
+                       ('cd', float), ('max_cd', float), ('attacking', bool)])
+
 
 # M units vs N units, starcraft environment
 class StarCraftMvN(sc.StarCraftBaseEnv):
@@ -160,108 +165,105 @@ class StarCraftMvN(sc.StarCraftBaseEnv):
         self.prev_actions = actions
         return cmds
 
-    def _make_observation(self):
-        myself = None
-        enemy = None
-
-        full_obs = np.zeros((self.nagents,) + self.observation_space.shape)
-
-        for idx in range(self.nagents):
-            agent_id = self.agent_ids[idx]
-
-            if agent_id in self.my_current_units:
-                myself = self.my_current_units[agent_id]
-            else:
-                myself = None
-
-            if myself is None:
+    def _unit_array(self, ids, current_units, n):
+        # UNIT_DTYPE fields of the units with the first n ids, units which
+        # are not alive are left at 0 but for max_hp and max_cd at 1
+        rows = [(False, 0, 0, 0, 1, 0, 1, False)] * n
+        for idx, unit_id in enumerate(ids[:n]):
+            unit = current_units.get(unit_id)
+            if unit is None:
                 continue
+            attributes = self.unit_attributes[unit.type]
+            rows[idx] = (True, unit.x, unit.y, unit.health + unit.shield, unit.max_health + unit.max_shield,
+                         getattr(unit, attributes['cdAttribute']), attributes['maxCD'],
+                         unit.attacking or unit.starting_attack)
+        return np.array(rows, dtype=UNIT_DTYPE)
+
+    def _refresh_units(self):
+        '''
+        Reads our and the enemy units from the state once per frame, into the
+        UNIT_DTYPE arrays my_units (nagents,) and enemy_units (nenemies,)
+        in the order of agent_ids and enemy_ids.
+        '''
+        self.my_units = self._unit_array(self.agent_ids, self.my_current_units, self.nagents)
+        self.enemy_units = self._unit_array(self.enemy_ids, self.enemy_current_units, self.nenemies)
+
+    def _enemy_offsets(self):
+        '''
+        Marks in attack_map the alive enemies the alive agents attack since
+        their last action.
+        returns
+            - pair: bool array (nagents, nenemies), True where both are alive
+            - dx, dy: float arrays (nagents, nenemies), agent minus enemy
+            - in_vision: bool array (nagents, nenemies), pairs the agent sees
+        '''
+        me, enemy = self.my_units, self.enemy_units
+        pair = me['alive'][:, None] & enemy['alive']
+
+        attacked = np.asarray(self.prev_actions)[:, None] == np.arange(self.nenemies) + len(self.move_steps)
+        self.attack_map[pair & me['attacking'][:, None] & attacked] = 1
+
+        dx = me['x'][:, None] - enemy['x']
+        dy = me['y'][:, None] - enemy['y']
+        in_vision = pair & ((np.hypot(dx, dy) <= self.vision) | self.full_vision)
+        return pair, dx, dy, in_vision
 
-            curr_obs = full_obs[idx]
-            curr_obs[0] = myself.x / self.state1.map_size[0]
-            curr_obs[1] = myself.y / self.state1.map_size[1]
-
-            # To simplify add unit's health and shield points
-            curr_obs[2] = (myself.health + myself.shield) / (myself.max_health + myself.max_shield)
-
-            cd = getattr(myself, self.unit_attributes[myself.type]['cdAttribute'])
-
-            curr_obs[3] = cd / self.unit_attributes[myself.type]['maxCD']
-            curr_obs[4] = self.prev_actions[idx] / self.nactions
-
-            # Get observation for each enemy for each agent
-            for enemy_idx in range(self.nenemies):
-                enemy_id = self.enemy_ids[enemy_idx]
-                if enemy_id in self.enemy_current_units:
-                    enemy = self.enemy_current_units[enemy_id]
-                else:
-                    enemy = None
-
-                if enemy is None:
-                    continue
-
-                if (myself.attacking or myself.starting_attack) and \
-                    self.prev_actions[idx] == enemy_idx + len(self.move_steps):
-                    self.attack_map[idx][enemy_idx] = 1
-
-                distance = utils.get_distance(myself.x, myself.y, enemy.x, enemy.y)
-
-                obs_idx = 5 + enemy_idx * 5
-
-                if distance <= self.vision or self.full_vision:
-                    curr_obs[obs_idx] = (myself.x - enemy.x) / (self.vision)
-                    curr_obs[obs_idx + 1] = (myself.y - enemy.y) / (self.vision)
-                    curr_obs[obs_idx + 2] = 0
-                else:
-                    curr_obs[obs_idx] = 0
-                    curr_obs[obs_idx + 1] = 0
-                    curr_obs[obs_idx + 2] = 1
+    def _make_observation(self):
+        self._refresh_units()
+        me, enemy = self.my_units, self.enemy_units
 
-                curr_obs[obs_idx + 3] = (enemy.health + enemy.shield) / (enemy.max_health + enemy.max_shield)
-                cd = getattr(enemy, self.unit_attributes[enemy.type]['cdAttribute'])
-                curr_obs[obs_idx + 4] =  cd / self.unit_attributes[enemy.type]['maxCD']
+        full_obs = np.zeros((self.nagents,) + self.observation_space.shape)
+        full_obs[:, 0] = me['x'] / self.state1.map_size[0]
+        full_obs[:, 1] = me['y'] / self.state1.map_size[1]
+
+        # To simplify add unit's health and shield points
+        full_obs[:, 2] = me['hp'] / me['max_hp']
+        full_obs[:, 3] = me['cd'] / me['max_cd']
+        full_obs[:, 4] = np.asarray(self.prev_actions) / self.nactions
+        full_obs[~me['alive']] = 0
+
+        # Observation of each enemy for each agent, all 0 when either is dead
+        pair, dx, dy, in_vision = self._enemy_offsets()
+        enemy_obs = full_obs[:, 5:].reshape(self.nagents, self.nenemies, 5)
+        enemy_obs[..., 0] = np.where(in_vision, dx / self.vision, 0)
+        enemy_obs[..., 1] = np.where(in_vision, dy / self.vision, 0)
+        enemy_obs[..., 2] = pair & ~in_vision
+        enemy_obs[..., 3] = np.where(pair, enemy['hp'] / enemy['max_hp'], 0)
+        enemy_obs[..., 4] = np.where(pair, enemy['cd'] / enemy['max_cd'], 0)
 
         return full_obs
 
     def _compute_reward(self):
-        reward = np.zeros(self.nagents)
+        reward = np.where(self.my_units['alive'], self.TIMESTEP_PENALTY, 0.)
 
-        for idx in range(self.nagents):
-            if self.agent_ids[idx] in self.my_current_units:
-                reward[idx] += self.TIMESTEP_PENALTY
-            # Give own health difference as negative reward
-            reward[idx] += self.obs[idx][2] - self.obs_pre[idx][2]
+        # Give own health difference as negative reward
+        reward += self.obs[:, 2] - self.obs_pre[:, 2]
 
-            for enemy_idx in range(self.nenemies):
-                obs_idx = 5 + enemy_idx * 5
-                # If the agent has attacked this enemy, then give diff in enemy's health as +ve reward
-                if self.attack_map[idx][enemy_idx] == 1:
-                    reward[idx] += self.obs_pre[idx][obs_idx + 3] - self.obs[idx][obs_idx + 3]
+        # If the agent has attacked an enemy, then give diff in enemy's health as +ve reward
+        enemy_health = self.obs_pre[:, 8::5] - self.obs[:, 8::5]
+        reward += (self.attack_map * enemy_health).sum(axis=1)
 
         return reward
 
     def reward_terminal(self):
         # Terminal reward based on whether we won or not
-        reward = np.zeros(self.nagents)
 
-        for idx in range(self.nagents):
-            # Give terminal negative reward of each enemies' health
-            for enemy_idx in range(self.nenemies):
-                obs_idx = 5 + enemy_idx * 5
-                # 3 is the best scaling factor we found in our tests
-                reward[idx] += 0 - self.obs_pre[idx][obs_idx + 3] * 3
-
-            # If the agent has attacked and we have won, give positive reward
-            # which include some scaling factor of number of enemies and remaining health
-            if self._has_won() == 1 and self.attack_map[idx].any():
-                reward[idx] += +5 * self.nenemies + self.obs_pre[idx][2] * 3
-            elif self.nagents == self.nenemies and len(self.my_current_units) > len(self.enemy_current_units):
-                # Give some reward in case we didn't won but we have more units alive than enemy
-                # Remove this to ensure agents have a destructive nature
-                reward[idx] += 2
-            else:
-                # If it has finished, give whole agent's own health as negative reward
-                reward[idx] += 0 - self.obs_pre[idx][2] * 3
+        # Give terminal negative reward of each enemies' health
+        # 3 is the best scaling factor we found in our tests
+        reward = 0 - (self.obs_pre[:, 8::5] * 3).sum(axis=1)
+        health = self.obs_pre[:, 2]
+
+        # If the agent has attacked and we have won, give positive reward
+        # which include some scaling factor of number of enemies and remaining health
+        won = (self._has_won() == 1) & self.attack_map.any(axis=1)
+        if self.nagents == self.nenemies and len(self.my_current_units) > len(self.enemy_current_units):
+            # Give some reward in case we didn't won but we have more units alive than enemy
+            # Remove this to ensure agents have a destructive nature
+            other = 2
+        else:
+            # If it has finished, give whole agent's own health as negative reward
+            other = 0 - health * 3
+        reward += np.where(won, +5 * self.nenemies + health * 3, other)
 
         if self._has_won() == 1:
             self.episode_wins += 1
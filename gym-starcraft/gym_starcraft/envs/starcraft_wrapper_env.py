@@ -17,6 +17,12 @@ class StarCraftWrapperEnv(gym.Env):
                          help='Number of enemies')
         env.add_argument('--torchcraft_dir', type=str, default='~/TorchCraft',
                          help='TorchCraft directory')
+        env.add_argument('--simulator', type=str, default='torchcraft',
+                         help='torchcraft|local, local runs the micro simulator of ' +
+                         'gym_starcraft.local_torchcraft instead of StarCraft')
+        env.add_argument('--pipelined', action='store_true', default=False,
+                         help='Send the commands of both players at once and skip the ' +
+                         'frames of a step on the server')
         env.add_argument('--bwapi_launcher_path', type=str,
                          default='../bwapi/bin/BWAPILauncher',
                          help='Path to BWAPILauncher')
@@ -0,0 +1,292 @@
+"""
+Local stand-in for the TorchCraft client, to run and profile the StarCraft
+envs without StarCraft, BWAPI or TorchCraft (simulator='local').
+
+Only the part of the client and state API the envs use is implemented:
+Client.connect/init/send/recv/close, state.units, aliveUnits, map_size and
+player_id, the unit fields read by the envs and the move, attack, stop,
+spawn and kill commands. The two clients of an env play in one LocalGame.
+Commands take effect when they are sent and the game moves on by the
+set_frameskip frames once both players have sent, like the two players of a
+LAN game. The states of both clients show the game as it is now, so after a
+round both see the same frame whichever client received first.
+
+The combat is a micro simulation: units go in straight lines at their speed,
+attack in range with their weapon cooldown, damage takes the shield first
+and idle units attack the closest enemy in sight like the game AI does.
+There is no armor, collision, pathing, splash or fog of war. Units keep
+their object for the episode, its fields are updated in place.
+Coordinates are walktiles (8 pixels), spawn commands take pixels as in OpenBW.
+"""
+
+import math
+from collections import namedtuple
+
+# Per unit type: hit and shield points, damage and cooldown of its weapon,
+# range against ground and air units in walktiles (0 when it can not hit
+# them), sight in pixels, speed in walktiles per frame and whether it flies
+UnitStats = namedtuple('UnitStats', ['health', 'shield', 'damage', 'cooldown', 'ground_range',
+                                     'air_range', 'sight', 'speed', 'flying'])
+
+UNIT_STATS = {
+    0:  UnitStats(40, 0, 6, 15, 16, 16, 224, 0.5, False),      # Marine
+    2:  UnitStats(80, 0, 20, 30, 20, 0, 256, 0.8, False),      # Vulture
+    8:  UnitStats(120, 0, 20, 22, 20, 20, 224, 0.83, True),    # Wraith
+    34: UnitStats(60, 0, 0, 1, 0, 0, 288, 0.5, False),         # Medic
+    37: UnitStats(35, 0, 5, 8, 2, 0, 160, 0.69, False),        # Zergling
+    43: UnitStats(120, 0, 9, 30, 12, 12, 224, 0.83, True),     # Mutalisk
+    60: UnitStats(100, 80, 5, 8, 0, 20, 288, 0.83, True),      # Corsair
+    65: UnitStats(100, 60, 16, 22, 2, 0, 224, 0.5, False),     # Zealot
+}
+
+# Size of micro-empty.scm in walktiles
+MAP_SIZE = (256, 256)
+
+
+class Constants(object):
+    '''
+    The torchcraft.Constants used by the envs, with values of their own.
+    '''
+    set_speed, set_gui, set_frameskip, set_cmd_optim, set_combine_frames = range(5)
+    command_unit, command_unit_protected, command_openbw = range(5, 8)
+
+    class unitcommandtypes(object):
+        Attack_Unit, Move, Stop = range(3)
+
+    class openbwcommandtypes(object):
+        SpawnUnit, KillUnit = range(2)
+
+    staticvalues = {'sightRange': {t: s.sight for t, s in UNIT_STATS.items()}}
+
+
+# The envs and the local game read the commands with the same constants
+try:
+    import torchcraft.Constants as tcc
+except ImportError:
+    tcc = Constants
+
+
+class Unit(object):
+
+    def __init__(self, uid, player_id, unit_type, x, y):
+        stats = UNIT_STATS[unit_type]
+        self.stats = stats
+        self.id = uid
+        self.playerId = player_id
+        self.type = unit_type
+        self.flying = stats.flying
+        self.health = self.max_health = stats.health
+        self.shield = self.max_shield = stats.shield
+        self.groundCD = self.airCD = 0
+        self.groundRange = stats.ground_range
+        self.airRange = stats.air_range
+        self.attacking = self.starting_attack = False
+        # None when idle, ('move', x, y) or ('attack', unit)
+        self.order = None
+        self.px, self.py = float(x), float(y)
+        self.x, self.y = int(x), int(y)
+
+    def move_towards(self, x, y):
+        # returns True when (x, y) is reached in this frame
+        dx, dy = x - self.px, y - self.py
+        dist = math.hypot(dx, dy)
+        if dist <= self.stats.speed:
+            self.px, self.py = float(x), float(y)
+        else:
+            self.px += dx / dist * self.stats.speed
+            self.py += dy / dist * self.stats.speed
+        self.x, self.y = int(round(self.px)), int(round(self.py))
+        return dist <= self.stats.speed
+
+    def range_to(self, target):
+        return self.airRange if target.flying else self.groundRange
+
+    def take_damage(self, damage):
+        absorbed = min(self.shield, damage)
+        self.shield -= absorbed
+        self.health = max(self.health - (damage - absorbed), 0)
+
+
+class LocalGame(object):
+    '''
+    One game shared by the clients of its players.
+    '''
+
+    def __init__(self, nplayers=2, map_size=MAP_SIZE):
+        self.nplayers = nplayers
+        self.map_size = list(map_size)
+        self.players = []
+        self.frame = 0
+        self.frameskip = 1
+        # alive units by id
+        self.units = {}
+        self.next_id = 0
+        # players which have sent commands for the next frame
+        self.sent = set()
+        # bumped by every submit, the view is rebuilt when it changed
+        self.version = 0
+        self._view = None
+
+    def join(self):
+        player_id = len(self.players)
+        self.players.append(player_id)
+        return player_id
+
+    def submit(self, player_id, commands):
+        self.version += 1
+        for command in commands:
+            self._apply(player_id, command)
+        self.sent.add(player_id)
+        if len(self.sent) < self.nplayers:
+            return
+        self.sent.clear()
+        for _ in range(self.frameskip):
+            self._frame()
+
+    def view(self):
+        '''
+        returns
+            - units: dict of player id to the list of its alive units
+            - alive: dict of the id to the type of every alive unit
+        '''
+        if self._view is None or self._view[0] != self.version:
+            units = {pid: [] for pid in self.players}
+            for unit in self.units.values():
+                units[unit.playerId].append(unit)
+            alive = {uid: unit.type for uid, unit in self.units.items()}
+            self._view = (self.version, units, alive)
+        return self._view[1:]
+
+    def _apply(self, player_id, command):
+        kind = command[0]
+        if kind in (tcc.command_unit, tcc.command_unit_protected):
+            # protected commands only differ from the others by not
+            # restarting an attack animation, which is not simulated
+            unit = self.units.get(command[1])
+            if unit is None or unit.playerId != player_id:
+                return
+            ctype = command[2]
+            if ctype == tcc.unitcommandtypes.Move:
+                x = min(max(command[4], 0), self.map_size[0] - 1)
+                y = min(max(command[5], 0), self.map_size[1] - 1)
+                unit.order = ('move', x, y)
+            elif ctype == tcc.unitcommandtypes.Attack_Unit:
+                target = self.units.get(command[3])
+                if target is not None and target.playerId != player_id:
+                    unit.order = ('attack', target)
+            elif ctype == tcc.unitcommandtypes.Stop:
+                unit.order = None
+        elif kind == tcc.command_openbw:
+            if command[1] == tcc.openbwcommandtypes.SpawnUnit:
+                owner, unit_type, x, y = command[2:6]
+                unit = Unit(self.next_id, owner, unit_type, x / 8, y / 8)
+                self.units[unit.id] = unit
+                self.next_id += 1
+            elif command[1] == tcc.openbwcommandtypes.KillUnit:
+                unit = self.units.pop(command[2], None)
+                if unit is not None:
+                    unit.health = unit.shield = 0
+        elif kind == tcc.set_frameskip:
+            self.frameskip = max(int(command[1]), 1)
+
+    def _closest_enemy(self, unit):
+        # in sight and hittable, what an idle unit attacks on its own
+        sight = unit.stats.sight / 8
+        closest, mini = None, math.inf
+        for other in self.units.values():
+            if other.playerId == unit.playerId or other.health <= 0 or not unit.range_to(other):
+                continue
+            dist = math.hypot(other.px - unit.px, other.py - unit.py)
+            if dist <= sight and dist < mini:
+                closest, mini = other, dist
+        return closest
+
+    def _frame(self):
+        for unit in self.units.values():
+            unit.attacking = unit.starting_attack = False
+            unit.groundCD = unit.airCD = max(unit.groundCD - 1, 0)
+
+        for unit in list(self.units.values()):
+            if unit.health <= 0:
+                continue
+            if unit.order is None and unit.stats.damage:
+                target = self._closest_enemy(unit)
+                if target is not None:
+                    unit.order = ('attack', target)
+
+            if unit.order is None:
+                continue
+            if unit.order[0] == 'move':
+                if unit.move_towards(unit.order[1], unit.order[2]):
+                    unit.order = None
+                continue
+
+            target = unit.order[1]
+            weapon_range = unit.range_to(target)
+            if target.health <= 0 or not weapon_range:
+                unit.order = None
+            elif math.hypot(target.px - unit.px, target.py - unit.py) <= weapon_range:
+                unit.attacking = True
+                if unit.groundCD == 0:
+                    target.take_damage(unit.stats.damage)
+                    unit.groundCD = unit.airCD = unit.stats.cooldown
+                    unit.starting_attack = True
+            else:
+                unit.move_towards(target.px, target.py)
+
+        for uid in [uid for uid, unit in self.units.items() if unit.health <= 0]:
+            del self.units[uid]
+        self.frame += 1
+
+
+class State(object):
+    '''
+    What a client sees of the game, always its current frame: a client which
+    receives before the other player has sent still sees the frame the
+    round plays once it is read, as with a server replying after the frame.
+    '''
+
+    def __init__(self, game, player_id):
+        self.game = game
+        self.player_id = player_id
+        self.map_size = game.map_size
+        self.game_ended = False
+
+    @property
+    def units(self):
+        return self.game.view()[0]
+
+    @property
+    def aliveUnits(self):
+        return self.game.view()[1]
+
+    @property
+    def frame_from_bwapi(self):
+        return self.game.frame
+
+
+class Client(object):
+
+    def __init__(self, game):
+        self.game = game
+        self.state = None
+
+    def connect(self, hostname=None, port=None):
+        # the address of a TorchCraft server is not used
+        self.player_id = self.game.join()
+
+    def init(self, setup=None):
+        self.state = State(self.game, self.player_id)
+        if setup:
+            self.send(setup)
+        return self.recv()
+
+    def send(self, commands):
+        self.game.submit(self.player_id, commands)
+        return True
+
+    def recv(self):
+        return self.state
+
+    def close(self):
+        pass
@@ -0,0 +1,91 @@
+from ic3net_envs.predator_prey_expert import BFSExpert
+import argparse
+import importlib
+import multiprocessing as mp
+import os
+import gym
+import ic3net_envs
+import numpy as np
+
+
+def make_env(args):
+    module, name = gym.spec(args.env).entry_point.split(':')
+    env = getattr(importlib.import_module(module), name)()
+    env.multi_agent_init(args)
+    return env
+
+
+def run_worker(job):
+    '''
+    Runs the expert for the episodes of one worker and writes them to
+    demo_<worker>.npz in args.out.
+    returns
+        - number of episodes and of successful ones
+    '''
+    args, worker, nepisodes = job
+    env = make_env(args)
+    env.seed(args.seed + worker)
+    expert = BFSExpert()
+    comm = np.zeros(env.npredator)
+
+    steps = {'obs': [], 'action': [], 'reward': [], 'predator_loc': [], 'prey_loc': [], 'episode': []}
+    grid_loc, grid_offset = [], [0]
+    success = 0
+    for episode in range(nepisodes):
+        obs = env.reset()
+        grid_loc.append(np.asarray(env.grid_loc))
+        grid_offset.append(grid_offset[-1] + len(env.grid_loc))
+        for t in range(args.max_steps):
+            action = expert.act(env)
+            steps['obs'].append(np.array(obs, dtype=np.float32))
+            steps['action'].append(action)
+            steps['predator_loc'].append(env.predator_loc.copy())
+            steps['prey_loc'].append(env.prey_loc.copy())
+            steps['episode'].append(episode)
+            obs, reward, done, _ = env.step([action, comm])
+            steps['reward'].append(reward)
+            if done:
+                break
+        success += env.stat.get('success', 0)
+
+    np.savez_compressed(os.path.join(args.out, 'demo_{:03d}.npz'.format(worker)),
+                        grid_loc=np.concatenate(grid_loc), grid_offset=np.array(grid_offset),
+                        **{k: np.stack(v) for k, v in steps.items()})
+    return nepisodes, success
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Write predator prey demonstrations of the BFS expert')
+    parser.add_argument('--out', type=str, required=True,
+                        help="Directory of the demo_<worker>.npz files, created if missing")
+    parser.add_argument('--env', type=str, default='PredatorPrey-v0',
+                        help="Gym id of the predator prey variant")
+    parser.add_argument('--episodes', type=int, default=1000,
+                        help="Number of episodes over all workers")
+    parser.add_argument('--nworkers', type=int, default=mp.cpu_count(),
+                        help="Number of worker processes")
+    parser.add_argument('--max_steps', type=int, default=20,
+                        help="Steps per episode at most")
+    parser.add_argument('--nagents', type=int, default=1,
+                        help="Number of predators")
+    parser.add_argument('--obstacles', default=10, type=int,
+                        help='number of obstacles in the environment')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='worker i seeds its env with seed + i')
+
+    module, name = gym.spec(parser.parse_known_args()[0].env).entry_point.split(':')
+    getattr(importlib.import_module(module), name)().init_args(parser)
+
+    args = parser.parse_args()
+    args.nfriendly = args.nagents
+    os.makedirs(args.out, exist_ok=True)
+
+    # episodes split as evenly as possible over the workers
+    counts = np.diff(np.linspace(0, args.episodes, args.nworkers + 1).astype(int))
+    jobs = [(args, worker, int(n)) for worker, n in enumerate(counts) if n]
+    with mp.Pool(len(jobs)) as pool:
+        results = pool.map(run_worker, jobs)
+
+    episodes = sum(r[0] for r in results)
+    success = sum(r[1] for r in results)
+    print('{} episodes in {} files, expert success rate {:.3f}'.format(episodes, len(jobs), success / episodes))
@@ -0,0 +1,46 @@
+from ic3net_envs.predator_prey_env import PredatorPreyEnv
+from ic3net_envs import scenario_bank
+import argparse
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Pre-sample predator prey start scenarios into a scenario bank')
+    parser.add_argument('--bank', type=str, required=True,
+                        help="Directory of the scenario bank, created if missing")
+    parser.add_argument('--nscenarios', type=int, default=100000,
+                        help="Number of scenarios to add to the bank")
+    parser.add_argument('--shard_size', type=int, default=10000,
+                        help="Number of scenarios per shard")
+    parser.add_argument('--loop', action="store_true", default=False,
+                        help="Keep adding shards until killed, to refresh the bank while training")
+    parser.add_argument('--max_shards', type=int, default=0,
+                        help="Drop the oldest shards above this many (0: keep all)")
+    parser.add_argument('--nagents', type=int, default=1,
+                        help="Number of predators")
+    parser.add_argument('--obstacles', default=10, type=int,
+                        help='number of obstacles in the environment')
+    parser.add_argument('--seed', type=int, default=-1,
+                        help='random seed. Pass -1 for random seed')
+
+    env = PredatorPreyEnv()
+    env.init_args(parser)
+
+    args = parser.parse_args()
+    args.nfriendly = args.nagents
+    # the producer samples the scenarios itself
+    args.scenario_bank = None
+    env.multi_agent_init(args)
+    if args.seed >= 0:
+        env.seed(args.seed)
+    scenario_bank.write_meta(args.bank, env.scenario_meta())
+
+    produced = 0
+    while args.loop or produced < args.nscenarios:
+        n = args.shard_size if args.loop else min(args.shard_size, args.nscenarios - produced)
+        name = scenario_bank.write_shard(args.bank, [env.sample_scenario() for _ in range(n)])
+        produced += n
+
+        shards = scenario_bank.list_shards(args.bank)
+        if args.max_shards:
+            for old in shards[:-args.max_shards]:
+                scenario_bank.remove_shard(args.bank, old)
+        print('{}: {} scenarios, {} shards in bank'.format(name, produced, min(len(shards), args.max_shards or len(shards))))
@@ -0,0 +1,65 @@
+from ic3net_envs import replay
+import ic3net_envs
+import argparse
+import importlib
+import time
+import gym
+import numpy as np
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Record random agent episodes, or replay recorded ones bit for bit')
+    parser.add_argument('--env', type=str, default='PredatorPrey-v0',
+                        help="Gym id of the environment")
+    parser.add_argument('--record', type=str, default=None,
+                        help="File to record the episodes to")
+    parser.add_argument('--replay', type=str, default=None,
+                        help="File of recorded episodes to replay and check")
+    parser.add_argument('--episodes', type=int, default=100,
+                        help="Number of episodes to record")
+    parser.add_argument('--max_steps', type=int, default=20,
+                        help="Steps per recorded episode")
+    parser.add_argument('--nagents', type=int, default=1,
+                        help="Number of agents")
+    parser.add_argument('--obstacles', default=10, type=int,
+                        help='number of obstacles in the environment')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the first recorded episode, the next ones count up')
+
+    # the bare env class of the gym id, with no wrapper in between
+    module, name = gym.spec(parser.parse_known_args()[0].env).entry_point.split(':')
+    env = getattr(importlib.import_module(module), name)()
+    env.init_args(parser)
+
+    args = parser.parse_args()
+    args.nfriendly = args.nagents
+    if (args.record is None) == (args.replay is None):
+        parser.error('pass one of --record and --replay')
+
+    env.multi_agent_init(args)
+
+    start = time.time()
+    if args.record:
+        naction = env.action_space.nvec[0] if hasattr(env.action_space, 'nvec') else env.action_space.n
+        shape = (env.nenvs, args.nagents) if hasattr(env, 'nenvs') else (args.nagents,)
+        trajectories = []
+        for seed in range(args.seed, args.seed + args.episodes):
+            # the random agent is seeded too, so a recording is reproducible
+            agent = np.random.default_rng(seed)
+            actions = []
+            for _ in range(args.max_steps):
+                action = agent.integers(naction, size=shape)
+                if hasattr(env, 'comm'):
+                    # predator prey envs take the communication actions along
+                    action = (action, np.zeros(shape))
+                actions.append(action)
+            trajectories.append(replay.record(env, seed, actions))
+        replay.save(args.record, trajectories)
+    else:
+        trajectories = replay.load(args.replay)
+        for trajectory in trajectories:
+            replay.replay(env, trajectory)
+
+    elapsed = time.time() - start
+    steps = sum(len(t['actions']) for t in trajectories)
+    print('{} {} episodes, {} steps in {:.3f}s ({:.0f} steps/s)'.format(
+        'recorded' if args.record else 'replayed', len(trajectories), steps, elapsed, steps / elapsed))
@@ -0,0 +1,41 @@
+from ic3net_envs.episode_recorder import read_episodes
+import argparse
+import time
+import numpy as np
+
+# drawn in this order, entities on the same cell are written side by side
+SYMBOLS = (('road_loc', '_'), ('grid_loc', '#'), ('prey_loc', 'P'), ('predator_loc', 'X'), ('car_loc', 'C'))
+
+
+def draw(frame):
+    grid = np.full(frame['dims'], '', dtype=object)
+    for key, symbol in SYMBOLS:
+        for y, x in frame.get(key, ()):
+            grid[y, x] = grid[y, x].replace('_', '') + symbol
+    lines = [''.join((item or '.').center(4) for item in row) for row in grid]
+    if frame['comm'] is not None:
+        lines.append('comm:   {}'.format(np.asarray(frame['comm']).ravel()))
+    if frame['reward'] is not None:
+        lines.append('reward: {}'.format(np.asarray(frame['reward']).ravel()))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser('Play episodes recorded with --record_episodes in the terminal')
+    parser.add_argument('path', type=str,
+                        help="Recorded episode file")
+    parser.add_argument('--delay', type=float, default=0.5,
+                        help="Seconds between two steps")
+    parser.add_argument('--episode', type=int, default=-1,
+                        help="Only play this episode (-1: all)")
+    args = parser.parse_args()
+
+    for i, episode in enumerate(read_episodes(args.path)):
+        if args.episode >= 0 and i != args.episode:
+            continue
+        for t, frame in enumerate(episode['frames']):
+            # clear the terminal and draw from its top left corner
+            print('\033[2J\033[H', end='')
+            print('episode {} step {} ({} frames dropped)'.format(i, t, episode.get('dropped', 0)))
+            print(draw(frame), flush=True)
+            time.sleep(args.delay)
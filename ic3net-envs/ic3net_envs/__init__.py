@@ -5,6 +5,51 @@ register(
     entry_point='ic3net_envs.predator_prey_env:PredatorPreyEnv',
 )
 
+register(
+    id='PredatorPreyBasicObstacle-v0',
+    entry_point='ic3net_envs.predator_prey_env_basic_obstacle:PredatorPreyEnv',
+)
+
+register(
+    id='PredatorPreyNoMask-v0',
+    entry_point='ic3net_envs.predator_prey_env_nomask:PredatorPreyEnv',
+)
+
+register(
+    id='PredatorPreyNorml-v0',
+    entry_point='ic3net_envs.predator_prey_env_norml:PredatorPreyEnv',
+)
+
+register(
+    id='PredatorPreyMovingPrey-v0',
+    entry_point='ic3net_envs.predator_prey_env_moving_prey:PredatorPreyEnv',
+)
+
+register(
+    id='PredatorPreyMovingMase-v0',
+    entry_point='ic3net_envs.predator_prey_env_moving_mase:PredatorPreyEnv',
+)
+
+register(
+    id='PredatorPreyLastUsage-v0',
+    entry_point='ic3net_envs.predator_prey_env_lastusage:PredatorPreyEnv',
+)
+
+register(
+    id='VecPredatorPrey-v0',
+    entry_point='ic3net_envs.vec_predator_prey_env:VecPredatorPrey',
+)
+
+register(
+    id='Levers-v0',
+    entry_point='ic3net_envs.levers_env:LeversEnv',
+)
+
+register(
+    id='NumberPairs-v0',
+    entry_point='ic3net_envs.number_pairs_env:NumberPairsEnv',
+)
+
 register(
     id='TrafficJunction-v0',
     entry_point='ic3net_envs.traffic_junction_env:TrafficJunctionEnv',
@@ -0,0 +1,46 @@
+"""
+Snapshot of the mutable state of an env, to branch rollouts from one env.
+
+The fixed shape arrays of the env are copied into the fields of one numpy
+structured record, allocated on the first save and refilled in place by the
+later ones. The rest (scalars, lists, sets, the random stream) is kept in a
+dict of shallow copies; arrays that are only read between two resets, like
+an obstacle layout, are kept by reference.
+"""
+
+import numpy as np
+
+
+class EnvState(object):
+
+    def __init__(self, arrays, objects):
+        '''
+        arrays: dict of name to the env arrays which are saved by value
+        objects: dict of name to the remaining values, already copied
+        '''
+        self.record = np.zeros((), dtype=[(k, v.dtype, v.shape) for k, v in arrays.items()])
+        self.objects = objects
+        self.save(arrays, objects)
+
+    def save(self, arrays, objects):
+        if self.record.dtype.names != tuple(arrays) or \
+           any(self.record[k].shape != v.shape for k, v in arrays.items()):
+            raise RuntimeError("The state was taken from an env with other shapes")
+        for k, v in arrays.items():
+            self.record[k] = v
+        self.objects = objects
+
+    def load(self, arrays):
+        # written into the env arrays, so the arrays the env hands out (like a
+        # reused observation buffer) and their aliases stay valid
+        for k, v in arrays.items():
+            np.copyto(v, self.record[k])
+        return self.objects
+
+    @classmethod
+    def capture(cls, state, arrays, objects):
+        # a new state, or the given one refilled
+        if state is None:
+            return cls(arrays, objects)
+        state.save(arrays, objects)
+        return state
@@ -0,0 +1,83 @@
+"""
+Headless recording of episodes for later viewing.
+
+The env pushes one small snapshot of its entities per step (plus the comm
+actions and rewards) on a bounded queue and returns at once; a writer process
+drains the queue and appends the finished episodes to a gzip file of pickled
+episode dicts. When the writer falls behind, frames are dropped instead of
+blocking the env, and counted in the 'dropped' of the episode; an episode
+whose first frame is dropped is skipped whole.
+
+examples/view_episodes.py plays a recorded file back in the terminal.
+"""
+
+import atexit
+import gzip
+import multiprocessing as mp
+import pickle
+import queue
+
+
+def _write(frames, path):
+    episode = None
+    with gzip.open(path, 'ab') as f:
+        while True:
+            frame, start, dropped = frames.get()
+            if start:
+                if episode is not None:
+                    episode['dropped'] = dropped
+                    pickle.dump(episode, f, pickle.HIGHEST_PROTOCOL)
+                    f.flush()
+                if frame is None:
+                    return
+                episode = {'frames': [], 'dropped': 0}
+            episode['frames'].append(frame)
+
+
+def read_episodes(path):
+    '''
+    Yields the recorded episodes of path in order.
+    '''
+    with gzip.open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class EpisodeRecorder(object):
+
+    def __init__(self, path, maxsize=10000):
+        self.frames = mp.Queue(maxsize)
+        self.writer = mp.Process(target=_write, args=(self.frames, path), daemon=True)
+        self.writer.start()
+        self.dropped = 0
+        self.skip = True
+        atexit.register(self.close)
+
+    def record(self, snapshot, comm=None, reward=None, start=False):
+        '''
+        Queues the snapshot of one step, start marks the first step of an
+        episode. Never blocks.
+        '''
+        if self.skip and not start:
+            self.dropped += 1
+            return
+        frame = dict(snapshot, comm=comm, reward=reward)
+        try:
+            # a start closes the last episode with the frames it lost
+            self.frames.put_nowait((frame, start, self.dropped))
+        except queue.Full:
+            self.dropped += 1
+            self.skip = self.skip or start
+            return
+        if start:
+            self.dropped = 0
+            self.skip = False
+
+    def close(self):
+        # writes the last episode and waits for the writer
+        if self.writer.is_alive():
+            self.frames.put((None, True, self.dropped))
+            self.writer.join()
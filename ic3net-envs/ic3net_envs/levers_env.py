@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Simulate the levers task for a batch of episodes at once.
+
+Each episode draws nagents distinct agents from a pool of total_agents, each
+of them pulls one of nagents levers and all get the fraction of distinct
+levers pulled as reward. An agent only observes its own identity, so the
+agents have to communicate to pull different levers.
+
+Design Decisions:
+    - agents: B x nagents ids in [0, total_agents)
+    - Obs. State: B x nagents x total_agents, one-hot identity of each agent
+    - Episodes last one step, the returned obs is the one of the next episode
+    - With nenvs == 1 the leading batch dimension is dropped, so the env can
+      stand in for a single episode env.
+"""
+
+# 3rd party modules
+import gym
+import numpy as np
+from gym import spaces
+
+
+class LeversEnv(gym.Env):
+
+    def __init__(self,):
+        self.__version__ = "0.0.1"
+        self.np_random = np.random.default_rng()
+
+    def init_args(self, parser):
+        env = parser.add_argument_group('Levers task')
+        env.add_argument('--total_agents', type=int, default=500,
+                         help="Number of agents the pullers of an episode are drawn from")
+        env.add_argument('--nenvs', type=int, default=1,
+                         help="Number of episodes stepped together")
+
+    def multi_agent_init(self, args):
+
+        # General variables defining the environment : CONFIG
+        params = ['total_agents', 'nenvs']
+        for key in params:
+            setattr(self, key, getattr(args, key))
+
+        self.nagents = args.nagents
+        if self.nagents > self.total_agents:
+            raise RuntimeError("Can not draw {} agents from {}".format(self.nagents, self.total_agents))
+
+        # one action per lever
+        self.naction = self.nagents
+        self.action_space = spaces.MultiDiscrete([self.naction])
+        self.observation_space = spaces.Box(low=0, high=1, shape=(self.total_agents,), dtype=int)
+
+        B = self.nenvs
+        self.agents = np.zeros((B, self.nagents), dtype=int)
+        self.obs = np.zeros((B, self.nagents, self.total_agents))
+        self.stat = dict()
+        return
+
+    def step(self, action):
+        """
+        Every episode pulls its levers and the next episodes are drawn.
+
+        Parameters
+        ----------
+        action : list whose first element holds the lever of each agent,
+                 nenvs x nagents.
+
+        Returns
+        -------
+        obs, reward, done, info : tuple
+            obs (ndarray) : nenvs x nagents x total_agents, of the next episodes.
+            reward (ndarray) : nenvs x nagents, fraction of distinct levers pulled.
+            done (ndarray) : nenvs bools, all true.
+            info (dict) : success flags.
+        """
+        action = np.asarray(action[0]).reshape(self.nenvs, self.nagents)
+        assert np.all(action < self.naction), "Actions should be in the range [0,naction)."
+
+        # distinct levers of a row are the changes along its sorted copy
+        levers = np.sort(action, axis=1)
+        distinct = 1 + np.count_nonzero(np.diff(levers, axis=1), axis=1)
+        reward = np.repeat(distinct[:, None] / self.nagents, self.nagents, axis=1)
+
+        success = (distinct == self.nagents).astype(int)
+        self.stat['success'] = self._unbatch(success)
+        self.stat['num_episodes'] = self.stat.get('num_episodes', 0) + self.nenvs
+        self.stat['episode_success'] = self.stat.get('episode_success', 0) + success.sum()
+
+        self._draw_agents()
+        done = np.ones(self.nenvs, dtype=bool)
+        return self._unbatch(self.obs), self._unbatch(reward), self._unbatch(done), {'success': self._unbatch(success)}
+
+    def reset(self):
+        """
+        Draws the agents of all B episodes and returns their observations.
+
+        Returns
+        -------
+        observation (ndarray): nenvs x nagents x total_agents
+        """
+        self.stat = dict()
+        self.obs.fill(0)
+        self._draw_agents()
+        return self._unbatch(self.obs)
+
+    def seed(self, seed=None):
+        self.np_random = np.random.default_rng(seed)
+        return [seed]
+
+    def _draw_agents(self):
+        B, n = self.agents.shape
+        if n * n <= self.total_agents:
+            # few agents from a large pool: redraw the rows with a repeated id
+            agents = self.np_random.integers(self.total_agents, size=(B, n))
+            todo = np.arange(B)
+            while todo.size:
+                ids = np.sort(agents[todo], axis=1)
+                todo = todo[np.any(ids[:, 1:] == ids[:, :-1], axis=1)]
+                agents[todo] = self.np_random.integers(self.total_agents, size=(todo.size, n))
+        else:
+            keys = self.np_random.random((B, self.total_agents))
+            agents = np.argpartition(keys, n - 1, axis=1)[:, :n]
+
+        # only the cells of the last agents are cleared
+        rows = np.arange(B)[:, None]
+        slots = np.arange(n)
+        self.obs[rows, slots, self.agents] = 0
+        self.obs[rows, slots, agents] = 1
+        self.agents = agents
+
+    def _unbatch(self, x):
+        return x[0] if self.nenvs == 1 else x
+
+    def reward_terminal(self):
+        return self._unbatch(np.zeros((self.nenvs, self.nagents)))
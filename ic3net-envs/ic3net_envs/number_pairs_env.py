@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Simulate the number pairs task for a batch of episodes at once.
+
+Each agent of an episode observes a private number in [0, max_message) and
+has to output the number of its partner, agent i + 1 (the last agent's
+partner is agent 0, with two agents each outputs the number of the other).
+The agents only know the numbers through communication.
+
+Design Decisions:
+    - numbers: B x nagents
+    - Obs. State: B x nagents x max_message, one-hot number of each agent
+    - Rewards 1 to each agent which outputs its partner's number, else 0
+    - Episodes last one step, the returned obs is the one of the next episode
+    - With nenvs == 1 the leading batch dimension is dropped, so the env can
+      stand in for a single episode env.
+"""
+
+# 3rd party modules
+import gym
+import numpy as np
+from gym import spaces
+
+
+class NumberPairsEnv(gym.Env):
+
+    def __init__(self,):
+        self.__version__ = "0.0.1"
+        self.np_random = np.random.default_rng()
+
+    def init_args(self, parser):
+        env = parser.add_argument_group('Number pairs task')
+        env.add_argument('--max_message', type=int, default=5,
+                         help="Numbers are drawn in [0, max_message)")
+        env.add_argument('--nenvs', type=int, default=1,
+                         help="Number of episodes stepped together")
+
+    def multi_agent_init(self, args):
+
+        # General variables defining the environment : CONFIG
+        params = ['max_message', 'nenvs']
+        for key in params:
+            setattr(self, key, getattr(args, key))
+
+        self.nagents = args.nagents
+        if self.nagents < 2:
+            raise RuntimeError("Number pairs needs at least 2 agents")
+
+        # one action per number
+        self.naction = self.max_message
+        self.action_space = spaces.MultiDiscrete([self.naction])
+        self.observation_space = spaces.Box(low=0, high=1, shape=(self.max_message,), dtype=int)
+
+        B = self.nenvs
+        self.numbers = np.zeros((B, self.nagents), dtype=int)
+        self.obs = np.zeros((B, self.nagents, self.max_message))
+        self.stat = dict()
+        return
+
+    def step(self, action):
+        """
+        Every episode is scored and the next episodes are drawn.
+
+        Parameters
+        ----------
+        action : list whose first element holds the number output by each
+                 agent, nenvs x nagents.
+
+        Returns
+        -------
+        obs, reward, done, info : tuple
+            obs (ndarray) : nenvs x nagents x max_message, of the next episodes.
+            reward (ndarray) : nenvs x nagents, 1 where the partner's number was output.
+            done (ndarray) : nenvs bools, all true.
+            info (dict) : success flags.
+        """
+        action = np.asarray(action[0]).reshape(self.nenvs, self.nagents)
+        assert np.all(action < self.naction), "Actions should be in the range [0,naction)."
+
+        correct = action == np.roll(self.numbers, -1, axis=1)
+        reward = correct.astype(float)
+
+        success = correct.all(axis=1).astype(int)
+        self.stat['success'] = self._unbatch(success)
+        self.stat['num_episodes'] = self.stat.get('num_episodes', 0) + self.nenvs
+        self.stat['episode_success'] = self.stat.get('episode_success', 0) + success.sum()
+
+        self._draw_numbers()
+        done = np.ones(self.nenvs, dtype=bool)
+        return self._unbatch(self.obs), self._unbatch(reward), self._unbatch(done), {'success': self._unbatch(success)}
+
+    def reset(self):
+        """
+        Draws the numbers of all B episodes and returns their observations.
+
+        Returns
+        -------
+        observation (ndarray): nenvs x nagents x max_message
+        """
+        self.stat = dict()
+        self.obs.fill(0)
+        self._draw_numbers()
+        return self._unbatch(self.obs)
+
+    def seed(self, seed=None):
+        self.np_random = np.random.default_rng(seed)
+        return [seed]
+
+    def _draw_numbers(self):
+        numbers = self.np_random.integers(self.max_message, size=self.numbers.shape)
+
+        # only the cells of the last numbers are cleared
+        rows = np.arange(self.nenvs)[:, None]
+        slots = np.arange(self.nagents)
+        self.obs[rows, slots, self.numbers] = 0
+        self.obs[rows, slots, numbers] = 1
+        self.numbers = numbers
+
+    def _unbatch(self, x):
+        return x[0] if self.nenvs == 1 else x
+
+    def reward_terminal(self):
+        return self._unbatch(np.zeros((self.nenvs, self.nagents)))
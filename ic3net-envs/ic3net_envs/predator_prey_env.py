@@ -14,12 +14,22 @@ Design Decisions:
     - Rewards -0.05 at each time step till the time
     - Episode never ends
     - Obs. State: Vocab of 1-hot < predator, preys & units >
+    - --obs_type crop hands each agent its (4, 2v+1, 2v+1) vision square
+      instead of the masked full map.
+    - --large_map keeps no full map array per agent: entities are coordinate
+      arrays, the cells seen so far a set of cell ids, and each agent gets its
+      vision square (--obs_type crop) or the list of entities in it
+      (--obs_type entities).
+    - --numba steps the dense map with the compiled loops of
+      predator_prey_kernel, on the same arrays and with the same results;
+      without Numba installed the NumPy code is used.
+    - The variants of the task (predator_prey_env_*.py) are subclasses which
+      only switch the feature flags of PredatorPreyEnv.
 """
 
 # core modules
 import copy
 
-import random
 import math
 import curses
 
@@ -27,11 +37,26 @@ import curses
 import gym
 import numpy as np
 from gym import spaces
-import random
+from ic3net_envs.predator_prey_helper import *
+from ic3net_envs.scenario_bank import ScenarioBank
+from ic3net_envs.env_state import EnvState
+from ic3net_envs import predator_prey_kernel
 
 class PredatorPreyEnv(gym.Env):
     # metadata = {'render.modes': ['human']}
 
+    # Feature flags of the variants
+    # preys follow the escape policy with --moving_prey
+    MOVING_PREY = False
+    # observed_obstacle keeps which obstacles have been seen
+    OBSTACLE_MASK = True
+    # obstacles are straight walls from get_wall_grids
+    WALLS = False
+    # obstacle free map with 3 channels, min_steps and full map agent_udt (pretraining)
+    NORML = False
+    # predators start in a range around the prey set by reset(epoch)
+    EPOCH_RESET = False
+
     def __init__(self,):
         self.__version__ = "0.0.1"
 
@@ -44,7 +69,8 @@ class PredatorPreyEnv(gym.Env):
         self.PREY_REWARD = 0
         self.POS_PREY_REWARD = 0.05
         self.episode_over = False
-        self.map_dim = 4
+        self.map_dim = 3 if self.NORML else 4
+        self.np_random = np.random.default_rng()
 
     def init_curses(self):
         self.stdscr = curses.initscr()
@@ -72,25 +98,48 @@ class PredatorPreyEnv(gym.Env):
                         help='cooperative|competitive|mixed (default: mixed)')
         env.add_argument('--enemy_comm', action="store_true", default=False,
                          help="Whether prey can communicate.")
+        env.add_argument('--scenario_bank', type=str, default=None,
+                         help="Directory of pre-sampled start scenarios to reset from")
+        env.add_argument('--large_map', action="store_true", default=False,
+                         help="Store entities and seen cells sparsely, for large dim and many agents")
+        env.add_argument('--obs_type', type=str, default='map',
+                         help="Observation of an agent: map|crop|entities, entities needs --large_map (default: map)")
+        env.add_argument('--numba', action="store_true", default=False,
+                         help="Step with compiled kernels when Numba is installed (map observations only)")
 
     def multi_agent_init(self, args):
 
         # General variables defining the environment : CONFIG
-        params = ['dim', 'vision', 'moving_prey', 'mode', 'enemy_comm']
+        params = ['dim', 'vision', 'moving_prey', 'mode', 'enemy_comm', 'large_map', 'obs_type', 'numba']
         for key in params:
             setattr(self, key, getattr(args, key))
 
         self.nprey = args.nenemies
-        self.nprey = 1
+        if not self.MOVING_PREY:
+            self.nprey = 1
         self.npredator = args.nfriendly
         self.dims = dims = (self.dim, self.dim)
         self.stay = not args.no_stay
-        self.ngrid = args.obstacles
+        self.ngrid = 0 if self.NORML else args.obstacles
 
-        if args.moving_prey:
+        if args.moving_prey and not self.MOVING_PREY:
             raise NotImplementedError
             # TODO
 
+        if self.obs_type not in ('map', 'crop', 'entities'):
+            raise RuntimeError("Incorrect obs_type, Available types: [map|crop|entities]")
+        if self.large_map:
+            if self.NORML:
+                raise NotImplementedError
+            if self.obs_type == 'map':
+                raise RuntimeError("--large_map has no full map observation, use --obs_type crop|entities")
+        elif self.obs_type == 'entities' or (self.obs_type == 'crop' and self.NORML):
+            raise NotImplementedError
+        if self.numba and (self.large_map or self.obs_type != 'map' or self.NORML):
+            raise NotImplementedError
+        # falls back to the NumPy code without Numba
+        self.compiled = self.numba and predator_prey_kernel.HAVE_NUMBA
+
         # (0: UP, 1: RIGHT, 2: DOWN, 3: LEFT, 4: STAY)
         # Define what an agent can do -
         if self.stay:
@@ -105,23 +154,71 @@ class PredatorPreyEnv(gym.Env):
         self.PREY_CLASS += self.BASE
         self.PREDATOR_CLASS += self.BASE
         self.GRID_CLASS += self.BASE
-        # embed n*n*3
-        self.true = np.zeros([self.map_dim, dims[0], dims[1]])
-        self.padding = np.zeros([self.map_dim, dims[0]+2*self.vision, dims[1]+2*self.vision])
-        self.agent_udt = np.zeros([self.npredator, 4, dims[0], dims[1]])
+        size = 2 * self.vision + 1
+        if self.large_map:
+            # offsets of the cells of a vision square, row by row
+            window = np.arange(-self.vision, self.vision + 1)
+            self.window = np.stack(np.meshgrid(window, window, indexing='ij'), axis=-1).reshape(-1, 2)
+            # flat ids of the cells seen since the reset
+            self.visited = set()
+        else:
+            # embed n*n*3
+            self.true = np.zeros([self.map_dim, dims[0], dims[1]])
+            self.padding = np.zeros([self.map_dim, dims[0]+2*self.vision, dims[1]+2*self.vision])
+            if self.obs_type == 'crop':
+                self.agent_obs = np.zeros([self.npredator, self.map_dim, size, size])
+                # 1 on the map cells, the crop of an agent reads its seen channel here
+                self.inside = np.pad(np.ones(dims), self.vision, 'constant')
+                self.union = np.zeros(self.inside.shape)
+            else:
+                self.agent_obs = np.zeros([self.npredator, self.map_dim, dims[0], dims[1]])
+            if self.NORML:
+                self.agent_udt = np.zeros([self.npredator, self.map_dim, dims[0], dims[1]])
+            else:
+                self.agent_udt = self.agent_obs
+            # cells written by the last embed_grid, embedded=False forces a full rebuild
+            self.embedded_predator_loc = np.zeros([self.npredator, 2], dtype=int)
+            self.embedded_prey_loc = np.zeros([self.nprey, 2], dtype=int)
+            self.embedded = False
+            if self.obs_type == 'crop':
+                # window (y, x) of these views of the padded buffers is the
+                # vision square of an agent standing on cell (y, x)
+                window_view = np.lib.stride_tricks.sliding_window_view
+                self.padding_windows = window_view(self.padding, (size, size), axis=(1, 2))
+                self.inside_windows = window_view(self.inside, (size, size))
+                self.union_windows = window_view(self.union, (size, size), writeable=True)
         self.ppweight = 2
         self.min_steps = 0
         self.comm = np.zeros([self.npredator])
-        self.observed_obstacle = np.zeros(self.ngrid)
+        if self.OBSTACLE_MASK and not self.WALLS:
+            self.observed_obstacle = np.zeros(self.ngrid)
         # Setting max vocab size for 1-hot encoding
         self.vocab_size = 1 + 1 + self.BASE + 1 + 1
         #          predator + prey + grid + outside
 
         # Observation for each agent will be vision * vision ndarray
         #self.observation_space = spaces.Box(low=0, high=1, shape=(self.vocab_size, (2 * self.vision) + 1, (2 * self.vision) + 1), dtype=int)
-        self.observation_space = spaces.Box(low=0, high=1, shape=(4, self.dim, self.dim), dtype=int) # change input to m*m*3
+        if self.obs_type == 'crop':
+            self.observation_space = spaces.Box(low=0, high=1, shape=(self.map_dim, size, size), dtype=int)
+        elif self.obs_type == 'entities':
+            # (seen, predator, prey, obstacle, dy / vision, dx / vision) of every
+            # entity in the vision square, then zero rows
+            nobstacle = size * size if self.WALLS else min(self.ngrid, size * size)
+            self.nslot = self.npredator + self.nprey + nobstacle
+            self.observation_space = spaces.Box(low=-1, high=1, shape=(self.nslot, 6))
+        else:
+            self.observation_space = spaces.Box(low=0, high=1, shape=(self.map_dim, self.dim, self.dim), dtype=int) # change input to m*m*3
         # Actual observation will be of the shape 1 * npredator * (2v+1) * (2v+1) * vocab_size
 
+        # the vocab grid does not depend on the episode
+        if not self.large_map:
+            self._set_grid()
+
+        self.scenario_bank = None
+        if args.scenario_bank:
+            if self.WALLS or self.NORML:
+                raise NotImplementedError
+            self.scenario_bank = ScenarioBank(args.scenario_bank, self.scenario_meta())
         return
 
     def step(self, action):
@@ -148,8 +245,12 @@ class PredatorPreyEnv(gym.Env):
         action = np.array(action).squeeze()
         action = np.atleast_1d(action)
 
-        for i, a in enumerate(action):
-            self._take_action(i, a)
+        if self.moving_prey:
+            self.prey_take_action()
+        if self.NORML:
+            # every agent is handed the whole map of the last observation
+            self.agent_udt = np.repeat(self.true[np.newaxis], self.npredator, axis=0)
+        self._take_action(action)
 
         assert np.all(action <= self.naction), "Actions should be in the range [0,naction)."
 
@@ -157,55 +258,49 @@ class PredatorPreyEnv(gym.Env):
         self.episode_over = False
         self.obs = self._get_obs()
 
-        debug = {'predator_locs':self.predator_loc,'prey_locs':self.prey_loc}
+        debug = {'predator_locs':self.predator_loc,'prey_locs':self.prey_loc,
+                 'action_mask': self.action_mask()}
         return self.obs, self._get_reward(), self.episode_over, debug
 
-    def reset(self):
+    def reset(self, epoch=None):
         """
         Reset the state of the environment and returns an initial observation.
 
+        Parameters
+        ----------
+        epoch : current training epoch, only used by the EPOCH_RESET variant.
+
         Returns
         -------
         observation (object): the initial observation of the space.
         """
         self.episode_over = False
         self.reached_prey = np.zeros(self.npredator)
+        #if epoch % 200 < self.dim-1: #
+        #    self.curr_gen_range = epoch % 200 +1
+        #else:
+        self.curr_gen_range = self.dim
 
         # Locations
-        locs = self._get_cordinates() #original without obstacle
-        # self.predator_loc, self.prey_loc = locs[:self.npredator], locs[self.npredator:]
-        self.predator_loc, self.prey_loc, self.grid_loc = locs[:self.npredator], locs[self.npredator:
-                                                                                      self.npredator + self.nprey], \
-                                                          locs[self.npredator + self.nprey:]
-
-        for cord in locs[:self.npredator + self.nprey].tolist():
-            if cord[0] == 0:
-                if cord[1] == 0:
-                    sur = [[cord[0] + 1, cord[1]], [cord[0], cord[1] + 1]]
-                elif cord[1] == self.dim - 1:
-                    sur = [[cord[0] + 1, cord[1]], [cord[0], cord[1] - 1]]
-                else:
-                    sur = [[cord[0] + 1, cord[1]], [cord[0], cord[1] + 1], [cord[0], cord[1] - 1]]
-            elif cord[0] == self.dim - 1:
-                if cord[1] == 0:
-                    sur = [[cord[0] - 1, cord[1]], [cord[0], cord[1] + 1]]
-                elif cord[1] == self.dim - 1:
-                    sur = [[cord[0] - 1, cord[1]], [cord[0], cord[1] - 1]]
-                else:
-                    sur = [[cord[0] - 1, cord[1]], [cord[0], cord[1] + 1], [cord[0], cord[1] - 1]]
-            elif cord[1] == 0:
-                sur = [[cord[0] + 1, cord[1]], [cord[0] - 1, cord[1]], [cord[0], cord[1] + 1]]
-            elif cord[1] == self.dim - 1:
-                sur = [[cord[0] + 1, cord[1]], [cord[0] - 1, cord[1]], [cord[0], cord[1] - 1]]
-            else:
-                sur = [[cord[0] + 1, cord[1]], [cord[0] - 1, cord[1]], [cord[0], cord[1] + 1], [cord[0], cord[1] - 1]]
-            d = [False for c in sur if c not in self.grid_loc.tolist()]
-            if not d:
-                self.reset()
-
-        # self.get_min_steps()
+        if self.scenario_bank is None:
+            scenario = self.sample_scenario()
+        else:
+            scenario = self.scenario_bank.sample(self.np_random)
+        # agents move in place, the layout arrays are only read
+        self.predator_loc = np.array(scenario['predator_loc'])
+        self.prey_loc = np.array(scenario['prey_loc'])
+        self.grid_loc = scenario['grid_loc']
+        self.occupancy = scenario['occupancy']
+        self.obstacle_id = scenario['obstacle_id']
+        if self.large_map:
+            self.visited = set()
+        else:
+            self.embedded = False
+        if self.OBSTACLE_MASK and self.WALLS:
+            self.observed_obstacle = np.zeros(self.grid_loc.shape[0])
 
-        self._set_grid()
+        if self.NORML:
+            self.get_min_steps()
 
         # stat - like success ratio
         self.stat = dict()
@@ -214,8 +309,94 @@ class PredatorPreyEnv(gym.Env):
         self.obs = self._get_obs()
         return self.obs
 
-    def seed(self):
-        return
+    def seed(self, seed=None):
+        '''
+        Restarts the random stream of the env, every draw of the env comes
+        from this numpy Generator so a seed and the actions taken fix the
+        whole trajectory.
+        '''
+        self.np_random = np.random.default_rng(seed)
+        return [seed]
+
+    def _state_arrays(self):
+        # the arrays of fixed shape which change within an episode
+        arrays = {'predator_loc': self.predator_loc, 'prey_loc': self.prey_loc, 'reached_prey': self.reached_prey}
+        if not self.large_map:
+            for key in ('true', 'padding', 'agent_obs', 'embedded_predator_loc', 'embedded_prey_loc'):
+                arrays[key] = getattr(self, key)
+            if self.NORML:
+                arrays['agent_udt'] = self.agent_udt
+        if self.OBSTACLE_MASK and not self.WALLS:
+            arrays['observed_obstacle'] = self.observed_obstacle
+        return arrays
+
+    def get_state(self, state=None):
+        '''
+        Saves everything a step or a reset changes, to go back to this point
+        with set_state. The layout arrays are only kept by reference as the
+        env never writes into them.
+        args
+            - state: an EnvState of this env to refill in place, a new one
+            is allocated if None.
+        returns
+            - state: EnvState
+        '''
+        objects = {'episode_over': self.episode_over, 'min_steps': self.min_steps,
+                   'curr_gen_range': self.curr_gen_range, 'comm': self.comm,
+                   'stat': dict(self.stat), 'obs': self.obs,
+                   'grid_loc': self.grid_loc, 'occupancy': self.occupancy, 'obstacle_id': self.obstacle_id,
+                   'np_random': self.np_random.bit_generator.state}
+        if self.large_map:
+            objects['visited'] = set(self.visited)
+        else:
+            objects['embedded'] = self.embedded
+        if self.NORML:
+            objects['cv'] = self.cv
+        if self.OBSTACLE_MASK and self.WALLS:
+            objects['observed_obstacle'] = self.observed_obstacle.copy()
+        return EnvState.capture(state, self._state_arrays(), objects)
+
+    def set_state(self, state):
+        '''
+        Puts the env back to the point state was taken at, the state is left
+        as is and can be restored again.
+        returns
+            - obs: the observation of that point
+        '''
+        objects = state.load(self._state_arrays())
+        for key, value in objects.items():
+            if key == 'np_random':
+                self.np_random.bit_generator.state = value
+            elif key in ('stat', 'visited', 'observed_obstacle'):
+                setattr(self, key, value.copy())
+            else:
+                setattr(self, key, value)
+        return self.obs
+
+    def sample_scenario(self):
+        '''
+        Draws a start layout and the structures derived from it.
+        returns
+            - scenario: dict of predator_loc, prey_loc, grid_loc, occupancy
+            and obstacle_id arrays, see scenario_bank.SCENARIO_FIELDS.
+        '''
+        if self.WALLS:
+            grid_loc, locs = self.availiable_set()
+        elif self.NORML:
+            locs = self._uniform_cordinates(0)
+            grid_loc = locs[self.npredator + self.nprey:]
+        else:
+            locs = self._get_cordinates()
+            grid_loc = locs[self.npredator + self.nprey:]
+        return {'predator_loc': locs[:self.npredator],
+                'prey_loc': locs[self.npredator:self.npredator + self.nprey],
+                'grid_loc': grid_loc,
+                'occupancy': get_occupancy(grid_loc, self.dims),
+                'obstacle_id': get_obstacle_ids(grid_loc, self.dims)}
+
+    def scenario_meta(self):
+        # config a scenario bank must have been sampled for to be used by this env
+        return {'dim': self.dim, 'npredator': self.npredator, 'nprey': self.nprey, 'ngrid': self.ngrid}
 
     def get_min_steps(self):
         min_s = 0
@@ -226,27 +407,50 @@ class PredatorPreyEnv(gym.Env):
                     min_s = temp
             else:
                 return 999
-        # self.min_steps = min_s pretrain
+        self.min_steps = min_s
 
     def embed_grid(self):
-        self.true = np.zeros([self.map_dim, self.dims[0], self.dims[1]])
-        for i, p in enumerate(self.predator_loc):
-            self.true[0, p[0], p[1]] = self.ppweight
-        for i, p in enumerate(self.prey_loc):
-            self.true[1, p[0], p[1]] = 2
-        for i, p in enumerate(self.grid_loc):
-            self.true[3, p[0], p[1]] = 2
+        # true and the interior of padding hold the same entity channels, only
+        # the cells of predators and preys that moved are rewritten between
+        # two resets.
         slice_y = slice(self.vision, self.padding.shape[1] - self.vision)
-        slice_x = slice(self.vision, self.padding.shape[1] - self.vision)
-        self.padding[1, slice_y, slice_x] = self.true[1, :, :]
-        self.padding[0, slice_y, slice_x] = self.true[0, :, :]
-        self.padding[3, slice_y, slice_x] = self.true[3, :, :]
-
-
+        slice_x = slice(self.vision, self.padding.shape[2] - self.vision)
+        inner = self.padding[:, slice_y, slice_x]
+        if not self.embedded:
+            self.true.fill(0)
+            inner[0].fill(0)
+            inner[1].fill(0)
+            if not self.NORML:
+                self.true[3, self.grid_loc[:, 0], self.grid_loc[:, 1]] = 2
+                inner[3] = self.true[3]
+            self.embedded = True
+        else:
+            for c, old in ((0, self.embedded_predator_loc), (1, self.embedded_prey_loc)):
+                self.true[c, old[:, 0], old[:, 1]] = 0
+                inner[c, old[:, 0], old[:, 1]] = 0
+
+        for c, new, value in ((0, self.predator_loc, self.ppweight), (1, self.prey_loc, 2)):
+            self.true[c, new[:, 0], new[:, 1]] = value
+            inner[c, new[:, 0], new[:, 1]] = value
+        np.copyto(self.embedded_predator_loc, self.predator_loc)
+        np.copyto(self.embedded_prey_loc, self.prey_loc)
+
+    def _uniform_cordinates(self, ngrid):
+        # predators, preys and ngrid obstacles on distinct cells drawn uniformly
+        idx = self.np_random.choice(np.prod(self.dims), self.npredator + self.nprey + ngrid, replace=False)
+        return np.vstack(np.unravel_index(idx, self.dims)).T
 
     def _get_cordinates(self):
-        idx = np.random.choice(np.prod(self.dims),(self.npredator + self.nprey+ self.ngrid), replace=False)
-        return np.vstack(np.unravel_index(idx, self.dims)).T
+        # Draw the obstacles first, then predators and preys from a single
+        # connected component of the free cells so everyone can reach the prey.
+        for _ in range(MAX_SPAWN_TRIES):
+            idx = self.np_random.choice(np.prod(self.dims), self.ngrid, replace=False)
+            grid_loc = np.vstack(np.unravel_index(idx, self.dims)).T
+            locs = sample_spawn(get_occupancy(grid_loc, self.dims), self.npredator + self.nprey, self.np_random)
+            if locs is not None:
+                return np.vstack((locs, grid_loc))
+        raise RuntimeError("No room for {} predators and preys between {} obstacles on a {}x{} map".format(
+            self.npredator + self.nprey, self.ngrid, self.dims[0], self.dims[1]))
 
     def _set_grid(self):
         self.grid = np.arange(self.BASE).reshape(self.dims)
@@ -257,114 +461,170 @@ class PredatorPreyEnv(gym.Env):
         # Padding for vision
         self.grid = np.pad(self.grid, self.vision, 'constant', constant_values = self.OUTSIDE_CLASS)
 
-        self.empty_bool_base_grid = self._onehot_initialization(self.grid)
-
     def _get_obs(self):
-        self.bool_base_grid = self.empty_bool_base_grid.copy()
+        if self.large_map:
+            return self._get_sparse_obs()
+        if self.compiled:
+            # no observed_obstacle without OBSTACLE_MASK
+            observed = self.observed_obstacle if self.OBSTACLE_MASK else np.zeros(0)
+            predator_prey_kernel.observe(self.true, self.padding, self.agent_obs, self.embedded_predator_loc,
+                                         self.embedded_prey_loc, self.predator_loc, self.prey_loc, self.grid_loc,
+                                         self.obstacle_id, observed, self.embedded, self.ppweight, self.vision,
+                                         self.OBSTACLE_MASK)
+            self.embedded = True
+            return self.agent_obs
+
         self.embed_grid()
-        padding_t = np.zeros([self.dim + self.vision*2, self.dim + self.vision*2])
-
-        for i, p in enumerate(self.predator_loc):
-            self.bool_base_grid[p[0] + self.vision, p[1] + self.vision, self.PREDATOR_CLASS] += 1
-
-        for i, p in enumerate(self.prey_loc):
-            self.bool_base_grid[p[0] + self.vision, p[1] + self.vision, self.PREY_CLASS] += 1
-
-        obs = []
-        myobs = []
-        for i, p in enumerate(self.predator_loc):
-            ept = np.zeros([self.map_dim, self.dim + self.vision * 2, self.dim + self.vision * 2])
-            slice_y = slice(p[0], p[0] + (2 * self.vision) + 1)
-            slice_x = slice(p[1], p[1] + (2 * self.vision) + 1)
-            obs.append(self.bool_base_grid[slice_y, slice_x])
-            padding_t[slice_y, slice_x] = 1
-            self.padding[2, slice_y, slice_x] = padding_t[slice_y, slice_x]
-            ept[:, slice_y, slice_x] = self.padding[:, slice_y, slice_x]
-            my_y = slice(self.vision, padding_t.shape[0] - self.vision)
-            my_x = slice(self.vision, padding_t.shape[0] - self.vision)
-            self.agent_udt[i, :, :, :] = copy.deepcopy(ept[:, my_y, my_x])
-            myobs.append(ept[:, my_y, my_x])
 
-        if self.enemy_comm:
-            for p in self.prey_loc:
-                slice_y = slice(p[0], p[0] + (2 * self.vision) + 1)
-                slice_x = slice(p[1], p[1] + (2 * self.vision) + 1)
-                obs.append(self.bool_base_grid[slice_y, slice_x])
-        slice_y = slice(self.vision, padding_t.shape[0]-self.vision)
-        slice_x = slice(self.vision, padding_t.shape[0]-self.vision)
-
-        self.true[2, :, :] = padding_t[slice_y, slice_x]
-        myobs = np.stack(myobs)
-        grid = np.where(myobs[:,3,:,:]>0)
-        for i in range(len(grid[0])):
-            g_x = np.where(self.grid_loc[:,0]==grid[1][i] ) # self.grid_loc[:,1]==test[2][i]).any()
-            g_y = np.where(self.grid_loc[:, 1] == grid[2][i])
-            answer = np.intersect1d(g_x[0], g_y[0], True)
-            self.observed_obstacle[answer[0]] = 1
+        # mark the vision squares of all agents as seen, window (y, x) of the
+        # sliding view is the square of an agent standing on cell (y, x)
+        size = 2 * self.vision + 1
+        seen = np.lib.stride_tricks.sliding_window_view(self.padding[2], (size, size), writeable=True)
+        seen[self.predator_loc[:, 0], self.predator_loc[:, 1]] = 1
+
+        if self.obs_type == 'crop':
+            return self._get_crop_obs()
+
+        # each agent gets the map cut down to its vision square, i.e. the
+        # inner padding scaled by a row band and a column band
+        axis = np.arange(self.dim)
+        rows = np.abs(axis - self.predator_loc[:, 0, None]) <= self.vision
+        cols = np.abs(axis - self.predator_loc[:, 1, None]) <= self.vision
+        inner = self.padding[:, self.vision:self.vision + self.dim, self.vision:self.vision + self.dim]
+        # written in place: the returned array is reused by the next step
+        myobs = self.agent_obs
+        np.multiply(inner, rows[:, None, :, None], out=myobs)
+        myobs *= cols[:, None, None, :]
+
+        if self.NORML:
+            # the entity channels before the vision square update
+            self.cv = self.true.copy()
+            self.cv[2] = 0
+
+        # union of the vision squares
+        np.max(myobs[:, 2], axis=0, out=self.true[2])
+        if self.OBSTACLE_MASK:
+            # obstacles inside the union of the vision squares
+            seen = self.obstacle_id[(self.true[2] > 0) & (self.obstacle_id >= 0)]
+            self.observed_obstacle[seen] = 1
         return myobs
 
-    def _take_action(self, idx, act):
-        # prey action
-        if idx >= self.npredator:
-            # fixed prey
-            if not self.moving_prey:
-                return
-            else:
-                raise NotImplementedError
+    def _get_crop_obs(self):
+        # the vision squares of all agents are read in one gather
+        y, x = self.predator_loc[:, 0], self.predator_loc[:, 1]
+        myobs = self.agent_obs
+        myobs[:] = self.padding_windows[:, y, x].swapaxes(0, 1)
+        myobs[:, 2] = self.inside_windows[y, x]
+
+        # union of the vision squares
+        self.union.fill(0)
+        self.union_windows[y, x] = 1
+        self.true[2] = self.union[self.vision:self.vision + self.dim, self.vision:self.vision + self.dim]
+        if self.OBSTACLE_MASK:
+            # obstacles inside the union of the vision squares
+            seen = self.obstacle_id[(self.true[2] > 0) & (self.obstacle_id >= 0)]
+            self.observed_obstacle[seen] = 1
+        return myobs
 
-        if self.reached_prey[idx] == 1:
-            return
+    def _get_sparse_obs(self):
+        # vision square cells of every agent, marked as seen while inside the map
+        cells = self.predator_loc[:, None, :] + self.window
+        inside = is_inside(cells, self.dims)
+        flat = cells[..., 0] * self.dim + cells[..., 1]
+        self.visited.update(flat[inside].tolist())
+        cells = cells.clip(0, self.dim - 1)
+        obstacle = np.where(inside, self.obstacle_id[cells[..., 0], cells[..., 1]], -1)
+        if self.OBSTACLE_MASK:
+            self.observed_obstacle[obstacle[obstacle >= 0]] = 1
+
+        # predators then preys, with their offset from each agent
+        offset = np.vstack((self.predator_loc, self.prey_loc))[None, :, :] - self.predator_loc[:, None, :]
+        seen = np.all(np.abs(offset) <= self.vision, axis=2)
+
+        if self.obs_type == 'crop':
+            size = 2 * self.vision + 1
+            myobs = np.zeros((self.npredator, self.map_dim, size, size))
+            myobs[:, 2] = inside.reshape(-1, size, size)
+            myobs[:, 3] = 2 * (obstacle >= 0).reshape(-1, size, size)
+            agent, entity = np.nonzero(seen)
+            is_prey = entity >= self.npredator
+            myobs[agent, is_prey.astype(int), offset[agent, entity, 0] + self.vision,
+                  offset[agent, entity, 1] + self.vision] = np.where(is_prey, 2, self.ppweight)
+            return myobs
+
+        rows = np.zeros((self.npredator, offset.shape[1] + len(self.window), 6))
+        rows[:, :offset.shape[1], 0] = seen
+        rows[:, :self.npredator, 1] = 1
+        rows[:, self.npredator:offset.shape[1], 2] = 1
+        rows[:, :offset.shape[1], 4:] = offset
+        rows[:, offset.shape[1]:, 0] = obstacle >= 0
+        rows[:, offset.shape[1]:, 3] = 1
+        rows[:, offset.shape[1]:, 4:] = self.window
+        # seen entities first, in the order above
+        order = np.argsort(rows[..., 0] == 0, axis=1, kind='stable')[:, :self.nslot]
+        myobs = np.take_along_axis(rows, order[..., None], axis=1)
+        myobs *= myobs[..., :1]
+        myobs[..., 4:] /= max(self.vision, 1)
+        return myobs
 
-        # STAY action
-        if act==5:
+    def _take_action(self, action):
+        # prey actions (enemy_comm) are ignored while the preys are fixed
+        if len(action) > self.npredator and self.moving_prey:
+            raise NotImplementedError
+        action = action[:self.npredator]
+        if self.compiled:
+            predator_prey_kernel.move_predators(self.predator_loc, action, self.occupancy, self.reached_prey)
             return
 
-        location = copy.deepcopy(self.predator_loc[idx])
-        if act == 0:
-            location[0] = location[0] - 1
-        elif act == 1:
-            location[1] = location[1] + 1
-        elif act == 2:
-            location[0] = location[0] + 1
-        elif act == 3:
-            location[1] = location[1] - 1
-
-        # UP
-        if act == 0 and self.grid[max(0,
-                                      self.predator_loc[idx][0] + self.vision - 1),
-                                  self.predator_loc[idx][1] + self.vision] != self.OUTSIDE_CLASS \
-            and location.tolist() not in self.grid_loc.tolist():
-            self.predator_loc[idx][0] = max(0, self.predator_loc[idx][0] - 1)
-
-        # RIGHT
-        elif act == 1 and self.grid[self.predator_loc[idx][0] + self.vision,
-                                    min(self.dims[1] - 1,
-                                        self.predator_loc[idx][1] + self.vision + 1)] != self.OUTSIDE_CLASS \
-            and location.tolist() not in self.grid_loc.tolist():
-            self.predator_loc[idx][1] = min(self.dims[1] - 1,
-                                            self.predator_loc[idx][1] + 1)
-
-        # DOWN
-        elif act == 2 and self.grid[min(self.dims[0] - 1,
-                                        self.predator_loc[idx][0] + self.vision + 1),
-                                    self.predator_loc[idx][1] + self.vision] != self.OUTSIDE_CLASS \
-            and location.tolist() not in self.grid_loc.tolist():
-            self.predator_loc[idx][0] = min(self.dims[0] - 1,
-                                            self.predator_loc[idx][0] + 1)
-
-        # LEFT
-        elif act == 3 and self.grid[self.predator_loc[idx][0] + self.vision,
-                                    max(0,
-                                        self.predator_loc[idx][1] + self.vision - 1)] != self.OUTSIDE_CLASS \
-            and location.tolist() not in self.grid_loc.tolist():
-            self.predator_loc[idx][1] = max(0, self.predator_loc[idx][1] - 1)
+        # UP, RIGHT, DOWN, LEFT: move unless the target is outside or an
+        # obstacle, STAY (4, or 5) is no move; predators which reached the
+        # prey no longer move
+        target = self.predator_loc + MOVES[np.minimum(action, 4)]
+        move = is_free(self.occupancy, target) & (self.reached_prey == 0)
+        self.predator_loc[move] = target[move]
+
+    def action_mask(self):
+        '''
+        returns
+            - mask: bool array (n, naction) of the moves _take_action would
+            carry out, only STAY for the predators which reached the prey. One
+            row per agent taking actions (preys included with enemy_comm, all
+            of their actions are legal).
+        '''
+        if self.compiled:
+            mask = predator_prey_kernel.legal_moves(self.occupancy, self.predator_loc, self.reached_prey, self.naction)
+        else:
+            mask = legal_moves(self.occupancy, self.predator_loc, self.naction, self.reached_prey == 1)
+        if self.enemy_comm:
+            mask = np.vstack((mask, np.ones((self.nprey, self.naction), dtype=bool)))
+        return mask
 
     def _get_reward(self):
         n = self.npredator if not self.enemy_comm else self.npredator + self.nprey
+        if self.compiled:
+            reward, nb_predator_on_prey = predator_prey_kernel.reward(
+                self.predator_loc, self.prey_loc, self.reached_prey, n, self.mode,
+                self.TIMESTEP_PENALTY, self.POS_PREY_REWARD, self.PREY_REWARD)
+        else:
+            reward, nb_predator_on_prey = self._reward_numpy(n)
+
+        if np.all(self.reached_prey == 1) and self.mode == 'mixed':
+            self.episode_over = True
+
+        # Success ratio
+        if self.mode != 'competitive':
+            if nb_predator_on_prey == self.npredator:
+                self.stat['success'] = 1
+            else:
+                self.stat['success'] = 0
+
+        return reward
+
+    def _reward_numpy(self, n):
         reward = np.full(n, self.TIMESTEP_PENALTY)
 
         # on_prey = np.where(np.all(self.predator_loc == self.prey_loc[0], axis=1))[0]  # added for pretrain
-        on_prey = np.where(np.all(self.predator_loc == self.prey_loc, axis=1))[0]  # commented for pretrain
+        on_prey = np.where(np.any(np.all(self.predator_loc[:, None] == self.prey_loc, axis=2), axis=1))[0]
         nb_predator_on_prey = on_prey.size
 
         if self.mode == 'cooperative':
@@ -379,24 +639,13 @@ class PredatorPreyEnv(gym.Env):
 
         self.reached_prey[on_prey] = 1
 
-        if np.all(self.reached_prey == 1) and self.mode == 'mixed':
-            self.episode_over = True
-
         # Prey reward
         if nb_predator_on_prey == 0:
             reward[self.npredator:] = -1 * self.TIMESTEP_PENALTY
         else:
             # TODO: discuss & finalise
             reward[self.npredator:] = 0
-
-        # Success ratio
-        if self.mode != 'competitive':
-            if nb_predator_on_prey == self.npredator:
-                self.stat['success'] = 1
-            else:
-                self.stat['success'] = 0
-
-        return reward
+        return reward, nb_predator_on_prey
 
     def reward_terminal(self):
         return np.zeros_like(self._get_reward())
@@ -444,11 +693,49 @@ class PredatorPreyEnv(gym.Env):
         self.stdscr.addstr(len(grid), 0, '\n')
         self.stdscr.refresh()
 
+    def snapshot(self):
+        # entities of the current step for the episode recorder, the agents
+        # move in place so their locations are copied
+        return {'dims': self.dims,
+                'predator_loc': self.predator_loc.copy(),
+                'prey_loc': self.prey_loc.copy(),
+                'grid_loc': np.asarray(self.grid_loc)}
+
     def seedset(self):
-        pos = [-1, 1, 0]
-        a = random.choice(pos)
-        b = random.choice(pos)
+        a, b = self.np_random.integers(-1, 2, size=2)
         return a, b
 
+    def prey_take_action(self):
+        if self.compiled:
+            # the draws escape_order breaks its ties with
+            keys = self.np_random.random((self.nprey, len(ESCAPE_ACTIONS)))
+            predator_prey_kernel.escape_preys(self.prey_loc, self.predator_loc, keys, self.occupancy,
+                                              self.vision * 2, self.vision)
+            return
+        self.prey_loc = escape_step(self.prey_loc, self.escape(), self.occupancy, self.vision)
+
+    def escape(self):
+        return escape_order(self.prey_loc, self.predator_loc, self.vision * 2, self.np_random)
+
+    def availiable_set(self):
+        wall_grids, avaliable_grids = get_wall_grids(self.dim, self.ngrid, self.np_random)
+        if not self.EPOCH_RESET:
+            idx = self.np_random.choice(len(avaliable_grids), self.npredator + self.nprey, replace=False)
+            return wall_grids, avaliable_grids[idx]
+
+        # predators start around the first prey, in the smallest range from
+        # curr_gen_range up that holds them all
+        idx = self.np_random.choice(len(avaliable_grids), self.nprey, replace=False)
+        overlap_agent_locs = []
+        curr_range = self.curr_gen_range-1
+        while len(overlap_agent_locs)<self.npredator:
+            curr_range+=1
+            overlap_agent_locs = agent_init_range(avaliable_grids, idx, curr_range)
+        agent_idx = self.np_random.choice(len(overlap_agent_locs), self.npredator, replace=False)
+        agent_locs = overlap_agent_locs[agent_idx]
+        prey_locs = avaliable_grids[idx]
+        locs = np.vstack((agent_locs, prey_locs))
+        return wall_grids, locs
+
     def exit_render(self):
         curses.endwin()
@@ -0,0 +1,50 @@
+"""
+Scripted predator policy for the predator prey envs.
+
+Every predator steps to the neighbouring cell closest to a prey along the
+free cells, read from a BFS distance field of the obstacle layout to the
+preys. The fields are kept in a LRU cache keyed by the layout and the prey
+cells, so a static prey costs one search per episode and a moving one a
+search per cell it visits.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from ic3net_envs.predator_prey_helper import MOVES, distance_field
+
+
+class BFSExpert(object):
+
+    def __init__(self, cache_size=256):
+        self.cache_size = cache_size
+        self.fields = OrderedDict()
+
+    def distance_field(self, occupancy, prey_loc):
+        key = (occupancy.shape, occupancy.tobytes(), np.asarray(prey_loc).tobytes())
+        dist = self.fields.get(key)
+        if dist is None:
+            dist = distance_field(occupancy, prey_loc)
+            self.fields[key] = dist
+            if len(self.fields) > self.cache_size:
+                self.fields.popitem(last=False)
+        else:
+            self.fields.move_to_end(key)
+        return dist
+
+    def act(self, env):
+        '''
+        returns
+            - actions: int array (npredator,), for all predators of env at
+            once. Ties go to the first action in MOVES order, predators that
+            can not reach any prey stay (or go UP without a STAY action).
+        '''
+        dist = self.distance_field(env.occupancy, env.prey_loc)
+        target = env.predator_loc[:, None, :] + MOVES[:env.naction] + 1
+        cost = dist[target[..., 0], target[..., 1]]
+        unreachable = cost < 0
+        actions = np.where(unreachable, np.iinfo(cost.dtype).max, cost).argmin(axis=1)
+        if env.naction > 4:
+            actions[unreachable.all(axis=1)] = 4
+        return actions
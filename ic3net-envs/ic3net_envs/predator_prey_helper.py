@@ -0,0 +1,282 @@
+import numpy as np
+
+# Offset of each action (0: UP, 1: RIGHT, 2: DOWN, 3: LEFT, 4: STAY)
+MOVES = np.array([[-1, 0], [0, 1], [1, 0], [0, -1], [0, 0]])
+
+# Obstacle layouts drawn before giving up on placing agents and preys
+MAX_SPAWN_TRIES = 100
+
+
+def get_occupancy(grid_loc, dims):
+    '''
+    returns
+        - occupancy: bool array of shape (dims[0] + 2, dims[1] + 2)
+        True on obstacle cells and on the one cell wide border around the map,
+        so a cell (x, y) is free to move on iff not occupancy[x + 1, y + 1].
+    '''
+    occupancy = np.ones((dims[0] + 2, dims[1] + 2), dtype=bool)
+    occupancy[1:-1, 1:-1] = False
+    grid_loc = np.asarray(grid_loc, dtype=int).reshape(-1, 2)
+    occupancy[grid_loc[:, 0] + 1, grid_loc[:, 1] + 1] = True
+    return occupancy
+
+
+def get_obstacle_ids(grid_loc, dims):
+    '''
+    returns
+        - obstacle_id: int array of shape dims, index in grid_loc of the
+        obstacle on each cell and -1 on free cells. A cell listed twice in
+        grid_loc keeps its first index.
+    '''
+    obstacle_id = np.full(dims, -1, dtype=int)
+    grid_loc = np.asarray(grid_loc, dtype=int).reshape(-1, 2)
+    obstacle_id[grid_loc[::-1, 0], grid_loc[::-1, 1]] = np.arange(len(grid_loc))[::-1]
+    return obstacle_id
+
+
+def is_free(occupancy, locs):
+    '''
+    Vectorized legality check: True where the cells in locs (..., 2) are inside
+    the map and not obstacles. locs must be at most one cell outside the map.
+    '''
+    locs = np.asarray(locs)
+    return ~occupancy[locs[..., 0] + 1, locs[..., 1] + 1]
+
+
+def legal_moves(occupancy, locs, naction, frozen=None):
+    '''
+    returns
+        - mask: bool array (n, naction), True where the move of MOVES[:naction]
+        from locs (n, 2) is taken. Frozen agents (n bools, the predators which
+        reached the prey) only have STAY. An agent without any legal move gets
+        all of them, a policy sampling from the mask always has a choice.
+    '''
+    mask = is_free(occupancy, np.asarray(locs)[:, None, :] + MOVES[:naction])
+    if frozen is not None:
+        mask[frozen] = np.arange(naction) == 4
+    mask[~mask.any(axis=1)] = True
+    return mask
+
+
+def is_inside(locs, dims):
+    '''
+    True where the cells in locs (..., 2) are inside the map of size dims.
+    '''
+    locs = np.asarray(locs)
+    return np.all((locs >= 0) & (locs < dims), axis=-1)
+
+
+def label_components(occupancy):
+    '''
+    Flood fill of the free cells of an occupancy grid (4-neighbourhood), any
+    leading batch dimensions are kept.
+    returns
+        - labels: int array of the map shape without the border, -1 on
+        obstacles, else the smallest flat index of the cell's component.
+    '''
+    free = ~occupancy[..., 1:-1, 1:-1]
+    ncell = free.shape[-2] * free.shape[-1]
+    labels = np.where(free, np.arange(ncell).reshape(free.shape[-2:]), ncell)
+    pad = [(0, 0)] * (free.ndim - 2) + [(1, 1), (1, 1)]
+    while True:
+        padded = np.pad(labels, pad, 'constant', constant_values=ncell)
+        spread = np.minimum.reduce([labels,
+                                    padded[..., :-2, 1:-1], padded[..., 2:, 1:-1],
+                                    padded[..., 1:-1, :-2], padded[..., 1:-1, 2:]])
+        spread = np.where(free, spread, ncell)
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    return np.where(free, labels, -1)
+
+
+def sample_spawn(occupancy, n, rng):
+    '''
+    Draws n distinct free cells from one connected component of the occupancy
+    grid, every cell of a component large enough to hold them being equally
+    likely to pick the component. rng is the numpy Generator of the env.
+    returns
+        - locs: int array (n, 2), None when no component has room for n cells.
+    '''
+    dims = (occupancy.shape[0] - 2, occupancy.shape[1] - 2)
+    labels = label_components(occupancy).ravel()
+    free = labels >= 0
+    sizes = np.bincount(labels[free], minlength=labels.size)
+    valid = np.flatnonzero(free & (sizes[labels.clip(0)] >= max(n, 2)))
+    if valid.size == 0:
+        return None
+    anchor = valid[rng.integers(valid.size)]
+    cells = np.flatnonzero(labels == labels[anchor])
+    idx = rng.choice(cells, n, replace=False)
+    return np.vstack(np.unravel_index(idx, dims)).T
+
+
+def sample_spawn_batch(occupancy, n, rng):
+    '''
+    sample_spawn for a batch of occupancy grids (B, dim + 2, dim + 2).
+    returns
+        - locs: int array (B, n, 2)
+        - ok: bool array (B,), False where no component has room for n cells,
+        the locs of those grids are meaningless.
+    '''
+    B = occupancy.shape[0]
+    dims = (occupancy.shape[1] - 2, occupancy.shape[2] - 2)
+    labels = label_components(occupancy).reshape(B, -1)
+    ncell = labels.shape[1]
+    rows = np.arange(B)[:, None]
+
+    free = labels >= 0
+    flat = np.where(free, labels + rows * ncell, B * ncell)
+    sizes = np.bincount(flat.ravel(), minlength=B * ncell + 1)[:B * ncell].reshape(B, ncell)
+    valid = free & (np.take_along_axis(sizes, labels.clip(0), axis=1) >= max(n, 2))
+
+    keys = rng.random((2, B, ncell))
+    anchor = labels[rows[:, 0], np.where(valid, keys[0], -1).argmax(axis=1)]
+    keys = np.where(labels == anchor[:, None], keys[1], 2)
+    idx = np.argsort(keys, axis=1)[:, :n]
+    return np.stack(np.unravel_index(idx, dims), axis=-1), valid.any(axis=1)
+
+
+# Actions ranked by the escape policy, 5 is the prey staying where it is
+ESCAPE_ACTIONS = np.array([0, 1, 2, 3, 5])
+
+# Votes of a near predator for each of ESCAPE_ACTIONS, indexed by the sign of
+# the prey - predator offset along each axis (+1): one vote per axis for the
+# move taking the prey away, both side moves when aligned, 999 to stay when on it
+ESCAPE_VOTES = np.zeros((3, 3, 5), dtype=int)
+ESCAPE_VOTES[0, :, 0] += 1
+ESCAPE_VOTES[2, :, 2] += 1
+ESCAPE_VOTES[1, :, [1, 3]] += 1
+ESCAPE_VOTES[:, 2, 1] += 1
+ESCAPE_VOTES[:, 0, 3] += 1
+ESCAPE_VOTES[:, 1, [0, 2]] += 1
+ESCAPE_VOTES[1, 1, 4] = 999
+
+
+def escape_order(prey_loc, predator_loc, reach, rng):
+    '''
+    Ranks the escape actions of every prey against all the predators closer
+    than reach on both axes at once, ties are broken at random.
+    returns
+        - actions: int array (nprey, 5) of ESCAPE_ACTIONS, best first; only 5
+        for the preys no predator is near.
+    '''
+    offset = prey_loc[:, None, :] - predator_loc[None, :, :]
+    near = np.all(np.abs(offset) <= reach, axis=2)
+    sign = np.sign(offset) + 1
+    scores = np.einsum('pn,pna->pa', near, ESCAPE_VOTES[sign[..., 0], sign[..., 1]])
+
+    # scores are integers, the random keys only reorder equal ones
+    keys = scores - 0.5 * rng.random(scores.shape)
+    actions = ESCAPE_ACTIONS[np.argsort(-keys, axis=1)]
+    actions[scores.max(axis=1) == 0] = 5
+    return actions
+
+
+def escape_step(prey_loc, actions, occupancy, vision):
+    '''
+    Moves every prey with the first of its ranked actions that is allowed,
+    staying in place at a 5 or when none is.
+    UP/LEFT are blocked by the map edge when vision > 0 while moving off the
+    bottom/right edge counts as a move in place, and the obstacle probe of an
+    action carries the offsets of the actions tried before it.
+    returns
+        - prey_loc: int array (nprey, 2), the new locations.
+    '''
+    dims = np.array(occupancy.shape) - 2
+    offsets = MOVES[np.minimum(actions, 4)]
+    target = prey_loc[:, None, :] + offsets
+    probe = prey_loc[:, None, :] + offsets.cumsum(axis=1)
+
+    off_edge = ((actions == 0) | (actions == 3)) & (vision > 0) & ((target < 0) | (target >= dims)).any(axis=2)
+    cell = (probe + 1).clip(0, dims + 1)
+    blocked = ((probe >= 0) & (probe < dims)).all(axis=2) & occupancy[cell[..., 0], cell[..., 1]]
+    stop = (actions == 5) | ~(off_edge | blocked)
+
+    first = stop.argmax(axis=1)
+    rows = np.arange(len(prey_loc))
+    move = stop[rows, first] & (actions[rows, first] != 5)
+    new_loc = target[rows, first].clip(0, dims - 1)
+    return np.where(move[:, None], new_loc, prey_loc)
+
+
+def get_wall_grids(map_size, obstacle_limit, rng):
+    '''
+    Lays straight walls of random length on a map_size x map_size free-cell
+    bitmask until obstacle_limit wall cells are placed or a wall does not fit.
+    A wall takes consecutive free cells of a random row or column, then its
+    cells and their neighbours stop being free.
+    returns
+        - wall_grids: int array (nwall_cells, 2)
+        - available_grids: int array (nfree, 2) of the cells left free, column
+        by column.
+    '''
+    free = np.ones((map_size, map_size), dtype=bool)
+    walls = []
+    total_obstacles = 0
+    while total_obstacles < obstacle_limit:
+        # length, orientation and row or column of the wall in one draw
+        wall_length, horizontal, line = rng.integers([3, 0, 0], [int(obstacle_limit / 2) + 1, 2, map_size])
+        if horizontal:
+            cells = np.flatnonzero(free[line])
+        else:
+            cells = np.flatnonzero(free[:, line])
+        if len(cells) < wall_length:
+            break  # Not enough space to place the wall
+        start_index = rng.integers(len(cells) - wall_length + 1)
+        cells = cells[start_index:start_index + wall_length]
+        if horizontal:
+            wall = np.stack((np.full(wall_length, line), cells), axis=1)
+        else:
+            wall = np.stack((cells, np.full(wall_length, line)), axis=1)
+
+        walls.append(wall)
+        total_obstacles += wall_length
+        # the wall and the cells next to it are no longer free
+        taken = (wall[:, None, :] + MOVES[None, :, :]).reshape(-1, 2)
+        taken = taken[is_inside(taken, (map_size, map_size))]
+        free[taken[:, 0], taken[:, 1]] = False
+
+    wall_grids = np.concatenate(walls) if walls else np.zeros((0, 2), dtype=int)
+    available_grids = np.argwhere(free.T)[:, ::-1]
+    return wall_grids, available_grids
+
+
+def distance_field(occupancy, targets):
+    '''
+    Breadth first search (4-neighbourhood) from all the target cells (n, 2) at
+    once over the free cells of an occupancy grid, one wavefront per step.
+    returns
+        - dist: int array of the occupancy shape, steps from each cell (x, y)
+        to its nearest target at dist[x + 1, y + 1], -1 on obstacles, on the
+        border and on cells no target can be reached from.
+    '''
+    free = ~occupancy
+    dist = np.full(occupancy.shape, -1)
+    targets = np.asarray(targets).reshape(-1, 2)
+    frontier = np.zeros(occupancy.shape, dtype=bool)
+    frontier[targets[:, 0] + 1, targets[:, 1] + 1] = True
+    frontier &= free
+    d = 0
+    while frontier.any():
+        dist[frontier] = d
+        # the border is never free, so shifting the frontier can not wrap
+        spread = np.zeros_like(frontier)
+        spread[1:] |= frontier[:-1]
+        spread[:-1] |= frontier[1:]
+        spread[:, 1:] |= frontier[:, :-1]
+        spread[:, :-1] |= frontier[:, 1:]
+        frontier = spread & free & (dist < 0)
+        d += 1
+    return dist
+
+
+def agent_init_range(avaliable_grids, idx, dim):
+    '''
+    returns
+        - overlap: int array of the available cells at most dim away on both
+        axes from the cell avaliable_grids[idx[0]], ordered row by row.
+    '''
+    near = np.all(np.abs(avaliable_grids - avaliable_grids[idx[0]]) <= dim, axis=1)
+    overlap = avaliable_grids[near]
+    return overlap[np.lexsort((overlap[:, 1], overlap[:, 0]))]
@@ -0,0 +1,187 @@
+"""
+Compiled step kernels of PredatorPreyEnv (--numba).
+
+Each kernel does, with plain loops over the agents, what the NumPy code of
+the env does with array ops, on the same arrays and writing them in place,
+so the two paths give the same trajectories. The loops are compiled with
+Numba when it is installed; without it HAVE_NUMBA is False and the env keeps
+its NumPy path, the kernels would run as (slow) Python.
+
+Episodes recorded with examples/replay_episodes.py replay unchanged with
+--numba added, which checks the two paths against each other.
+"""
+
+import numpy as np
+
+from ic3net_envs.predator_prey_helper import MOVES, ESCAPE_ACTIONS, ESCAPE_VOTES
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+
+@njit(cache=True)
+def move_predators(predator_loc, action, occupancy, reached_prey):
+    # a move is taken when its target is inside the map and not an obstacle,
+    # predators which reached the prey no longer move
+    for i in range(predator_loc.shape[0]):
+        if reached_prey[i] == 1 or action[i] >= 4:
+            continue
+        y = predator_loc[i, 0] + MOVES[action[i], 0]
+        x = predator_loc[i, 1] + MOVES[action[i], 1]
+        if not occupancy[y + 1, x + 1]:
+            predator_loc[i, 0] = y
+            predator_loc[i, 1] = x
+
+
+@njit(cache=True)
+def escape_preys(prey_loc, predator_loc, keys, occupancy, reach, vision):
+    '''
+    escape_order then escape_step of predator_prey_helper, keys are the
+    (nprey, 5) uniform draws escape_order breaks the ties with.
+    '''
+    h = occupancy.shape[0] - 2
+    w = occupancy.shape[1] - 2
+    scores = np.zeros(5)
+    for p in range(prey_loc.shape[0]):
+        py, px = prey_loc[p, 0], prey_loc[p, 1]
+        scores[:] = 0
+        for n in range(predator_loc.shape[0]):
+            dy = py - predator_loc[n, 0]
+            dx = px - predator_loc[n, 1]
+            if abs(dy) <= reach and abs(dx) <= reach:
+                scores += ESCAPE_VOTES[np.sign(dy) + 1, np.sign(dx) + 1]
+        if scores.max() == 0:
+            continue
+        order = np.argsort(-(scores - 0.5 * keys[p]))
+
+        # first ranked action not stopped by the map edge or an obstacle
+        cy, cx = py, px
+        for k in range(5):
+            act = ESCAPE_ACTIONS[order[k]]
+            if act == 5:
+                break
+            ty, tx = py + MOVES[act, 0], px + MOVES[act, 1]
+            cy, cx = cy + MOVES[act, 0], cx + MOVES[act, 1]
+            outside = ty < 0 or ty >= h or tx < 0 or tx >= w
+            off_edge = (act == 0 or act == 3) and vision > 0 and outside
+            blocked = 0 <= cy < h and 0 <= cx < w and occupancy[cy + 1, cx + 1]
+            if not (off_edge or blocked):
+                prey_loc[p, 0] = min(max(ty, 0), h - 1)
+                prey_loc[p, 1] = min(max(tx, 0), w - 1)
+                break
+
+
+@njit(cache=True)
+def observe(true, padding, agent_obs, embedded_predator_loc, embedded_prey_loc, predator_loc, prey_loc,
+            grid_loc, obstacle_id, observed_obstacle, embedded, ppweight, vision, obstacle_mask):
+    '''
+    embed_grid and the map observation of _get_obs. After the first call of
+    an episode only the cells of the entities and of the vision squares of
+    the last step are rewritten.
+    '''
+    h, w = true.shape[1], true.shape[2]
+    v = vision
+    if not embedded:
+        true[:] = 0
+        padding[0:2] = 0
+        padding[3] = 0
+        agent_obs[:] = 0
+        for k in range(grid_loc.shape[0]):
+            true[3, grid_loc[k, 0], grid_loc[k, 1]] = 2
+            padding[3, grid_loc[k, 0] + v, grid_loc[k, 1] + v] = 2
+    else:
+        for k in range(embedded_predator_loc.shape[0]):
+            y, x = embedded_predator_loc[k, 0], embedded_predator_loc[k, 1]
+            true[0, y, x] = 0
+            padding[0, y + v, x + v] = 0
+            # the last observation of this agent is its last vision square
+            agent_obs[k, :, max(y - v, 0):y + v + 1, max(x - v, 0):x + v + 1] = 0
+        for k in range(embedded_prey_loc.shape[0]):
+            y, x = embedded_prey_loc[k, 0], embedded_prey_loc[k, 1]
+            true[1, y, x] = 0
+            padding[1, y + v, x + v] = 0
+
+    for k in range(predator_loc.shape[0]):
+        y, x = predator_loc[k, 0], predator_loc[k, 1]
+        true[0, y, x] = ppweight
+        padding[0, y + v, x + v] = ppweight
+        # seen cells, the padding border included
+        padding[2, y:y + 2 * v + 1, x:x + 2 * v + 1] = 1
+    for k in range(prey_loc.shape[0]):
+        y, x = prey_loc[k, 0], prey_loc[k, 1]
+        true[1, y, x] = 2
+        padding[1, y + v, x + v] = 2
+    embedded_predator_loc[:] = predator_loc
+    embedded_prey_loc[:] = prey_loc
+
+    # each agent sees the map inside its vision square, true[2] is the union
+    # of the squares and their obstacles are marked as observed
+    true[2] = 0
+    for k in range(predator_loc.shape[0]):
+        y0, y1 = max(predator_loc[k, 0] - v, 0), min(predator_loc[k, 0] + v + 1, h)
+        x0, x1 = max(predator_loc[k, 1] - v, 0), min(predator_loc[k, 1] + v + 1, w)
+        agent_obs[k, :, y0:y1, x0:x1] = padding[:, y0 + v:y1 + v, x0 + v:x1 + v]
+        true[2, y0:y1, x0:x1] = padding[2, y0 + v:y1 + v, x0 + v:x1 + v]
+        if obstacle_mask:
+            for y in range(y0, y1):
+                for x in range(x0, x1):
+                    if obstacle_id[y, x] >= 0:
+                        observed_obstacle[obstacle_id[y, x]] = 1
+
+
+@njit(cache=True)
+def reward(predator_loc, prey_loc, reached_prey, n, mode, timestep_penalty, pos_prey_reward, prey_reward):
+    '''
+    PredatorPreyEnv._reward_numpy, marks the predators on a prey in reached_prey.
+    returns
+        - reward: float array (n,)
+        - count: number of predators on a prey
+    '''
+    npredator = predator_loc.shape[0]
+    on_prey = np.zeros(npredator, dtype=np.bool_)
+    for i in range(npredator):
+        for j in range(prey_loc.shape[0]):
+            if predator_loc[i, 0] == prey_loc[j, 0] and predator_loc[i, 1] == prey_loc[j, 1]:
+                on_prey[i] = True
+    count = on_prey.sum()
+
+    if mode == 'cooperative':
+        value = pos_prey_reward * count
+    elif mode == 'competitive':
+        value = pos_prey_reward / max(count, 1)
+    elif mode == 'mixed':
+        value = prey_reward
+    else:
+        raise RuntimeError("Incorrect mode, Available modes: [cooperative|competitive|mixed]")
+
+    out = np.full(n, timestep_penalty)
+    for i in range(npredator):
+        if on_prey[i]:
+            out[i] = value
+            reached_prey[i] = 1
+    # preys
+    out[npredator:] = -1 * timestep_penalty if count == 0 else 0
+    return out, count
+
+
+@njit(cache=True)
+def legal_moves(occupancy, predator_loc, reached_prey, naction):
+    # see predator_prey_helper.legal_moves, the predators in reached_prey are frozen
+    mask = np.zeros((predator_loc.shape[0], naction), dtype=np.bool_)
+    for i in range(predator_loc.shape[0]):
+        any_legal = False
+        for a in range(naction):
+            if reached_prey[i] == 1:
+                mask[i, a] = a == 4
+            else:
+                mask[i, a] = not occupancy[predator_loc[i, 0] + MOVES[a, 0] + 1, predator_loc[i, 1] + MOVES[a, 1] + 1]
+            any_legal = any_legal or mask[i, a]
+        if not any_legal:
+            mask[i, :] = True
+    return mask
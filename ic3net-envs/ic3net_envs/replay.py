@@ -0,0 +1,84 @@
+"""
+Record and replay of episodes.
+
+A trajectory is the seed an env is seeded with before its reset and the list
+of actions handed to its step. Every draw of the envs comes from the numpy
+Generator set by seed(), so running a trajectory again gives the same episode
+bit for bit, which the digests of the observations and rewards recorded with
+it check. Trajectories recorded on one implementation of an env can be
+replayed on another one to compare both on the same workload.
+"""
+
+import hashlib
+import pickle
+
+import numpy as np
+
+
+def _update(h, a):
+    # observations may be nested tuples of arrays, one per agent and kind
+    if isinstance(a, (tuple, list)):
+        for x in a:
+            _update(h, x)
+    else:
+        h.update(np.ascontiguousarray(a).tobytes())
+
+
+def digest(obs, reward=None):
+    h = hashlib.sha1()
+    _update(h, obs)
+    if reward is not None:
+        _update(h, reward)
+    return h.hexdigest()
+
+
+def run(env, seed, actions):
+    '''
+    Seeds and resets env, then steps it with actions until they run out or
+    the episode is over.
+    returns
+        - digests: list of the digests of the first observation and of the
+        observation and reward of every step taken.
+    '''
+    env.seed(seed)
+    digests = [digest(env.reset())]
+    for action in actions:
+        obs, reward, done, _ = env.step(action)
+        digests.append(digest(obs, reward))
+        if np.ndim(done) == 0 and done:
+            break
+    return digests
+
+
+def record(env, seed, actions):
+    '''
+    returns
+        - trajectory: dict of the seed, the actions actually taken and their
+        digests.
+    '''
+    digests = run(env, seed, actions)
+    return {'seed': seed, 'actions': list(actions[:len(digests) - 1]), 'digests': digests}
+
+
+def replay(env, trajectory):
+    '''
+    Runs a recorded trajectory again, raises RuntimeError at the first step
+    that does not match the recording.
+    '''
+    digests = run(env, trajectory['seed'], trajectory['actions'])
+    for t, (old, new) in enumerate(zip(trajectory['digests'], digests)):
+        if old != new:
+            raise RuntimeError("Replay of seed {} diverges at step {}".format(trajectory['seed'], t))
+    if len(digests) != len(trajectory['digests']):
+        raise RuntimeError("Replay of seed {} ends after {} steps, not {}".format(
+            trajectory['seed'], len(digests) - 1, len(trajectory['digests']) - 1))
+
+
+def save(path, trajectories):
+    with open(path, 'wb') as f:
+        pickle.dump(trajectories, f)
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
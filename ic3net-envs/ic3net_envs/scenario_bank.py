@@ -0,0 +1,123 @@
+"""
+Bank of pre-sampled predator prey start scenarios.
+
+A bank is a directory holding a meta.json with the env config it was sampled
+for, and shard directories with one .npy file per scenario field stacked over
+the scenarios of the shard. Shards are written under a hidden name and renamed
+into place, so readers never see a partial one, and loaded with mmap_mode='r'
+so every worker process maps the same pages instead of holding a copy.
+
+Producers may add or remove shards while envs read the bank, readers pick the
+changes up every `rescan` samples.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+SCENARIO_FIELDS = ('predator_loc', 'prey_loc', 'grid_loc', 'occupancy', 'obstacle_id')
+META_FILE = 'meta.json'
+SHARD_PREFIX = 'shard_'
+
+
+def write_meta(path, meta):
+    '''
+    Creates the bank directory, or checks that an existing bank was sampled
+    for the same config.
+    '''
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, META_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            old = json.load(f)
+        if old != meta:
+            raise ValueError("Scenario bank {} was sampled for {}, not {}".format(path, old, meta))
+        return
+    tmp = os.path.join(path, '.' + META_FILE + str(os.getpid()))
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+
+def list_shards(path):
+    return sorted(name for name in os.listdir(path) if name.startswith(SHARD_PREFIX))
+
+
+def write_shard(path, scenarios):
+    '''
+    Adds a shard to the bank, scenarios is a list of dicts with SCENARIO_FIELDS.
+    returns
+        - name of the new shard
+    '''
+    name = '{}{:016d}_{}'.format(SHARD_PREFIX, time.time_ns(), os.getpid())
+    tmp = os.path.join(path, '.' + name)
+    os.makedirs(tmp)
+    for field in SCENARIO_FIELDS:
+        np.save(os.path.join(tmp, field + '.npy'), np.stack([s[field] for s in scenarios]))
+    os.rename(tmp, os.path.join(path, name))
+    return name
+
+
+def remove_shard(path, name):
+    # hide the shard before deleting it, readers that mapped it keep their pages
+    tmp = os.path.join(path, '.' + name)
+    os.rename(os.path.join(path, name), tmp)
+    shutil.rmtree(tmp)
+
+
+class ScenarioBank(object):
+
+    def __init__(self, path, meta, rescan=1000):
+        self.path = path
+        self.rescan = rescan
+        with open(os.path.join(path, META_FILE)) as f:
+            bank_meta = json.load(f)
+        if bank_meta != meta:
+            raise ValueError("Scenario bank {} was sampled for {}, not {}".format(path, bank_meta, meta))
+
+        self.shards = dict()
+        self._scan()
+        if not len(self):
+            raise RuntimeError("Scenario bank {} has no scenarios".format(path))
+
+    def _scan(self):
+        names = list_shards(self.path)
+        shards = dict()
+        for name in names:
+            if name in self.shards:
+                shards[name] = self.shards[name]
+                continue
+            try:
+                shards[name] = {field: np.load(os.path.join(self.path, name, field + '.npy'), mmap_mode='r')
+                                for field in SCENARIO_FIELDS}
+            except FileNotFoundError:
+                # removed by a producer since the listing
+                continue
+        if shards:
+            self.shards = shards
+        self.names = list(self.shards)
+        self.offsets = np.cumsum([0] + [len(self.shards[n]['occupancy']) for n in self.names])
+        self.nsampled = 0
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, idx):
+        shard = np.searchsorted(self.offsets, idx, side='right') - 1
+        i = idx - self.offsets[shard]
+        return {field: arr[i] for field, arr in self.shards[self.names[shard]].items()}
+
+    def sample(self, rng):
+        '''
+        Draws with rng, the numpy Generator of the env.
+        returns
+            - a scenario drawn uniformly from the bank, its arrays are read-only
+            views of the mapped shard.
+        '''
+        if self.nsampled >= self.rescan:
+            self._scan()
+        self.nsampled += 1
+        return self[rng.integers(len(self))]
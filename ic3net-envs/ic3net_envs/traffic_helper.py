@@ -1,7 +1,17 @@
+import os
+
 import numpy as np
 
 move = [(-1,0),(1,0),(0,-1),(0,1)]
 
+# bump when the routes built for a config change, older cache entries are
+# then no longer read
+ROUTE_CACHE_VERSION = 1
+ROUTE_FIELDS = ('route_npath', 'path_len', 'path_loc')
+
+# route tables built or loaded by this process, forked workers inherit them
+_route_tables = dict()
+
 def get_road_blocks(w, h, difficulty):
 
     # assuming 1 is the lane width for each direction.
@@ -207,3 +217,82 @@ def get_routes(dims, grid, difficulty):
                     break
         routes.append(paths)
     return routes
+
+
+def compile_routes(routes):
+    '''
+    args
+        - routes: list for each arrival point of the list of its paths, as
+        returned by get_routes.
+    returns
+        - tables: dict of ROUTE_FIELDS, route_npath the number of paths of
+        each arrival point, path p_i of arrival point r_i is row
+        p_i + r_i * route_npath[r_i] of path_loc (npath, max_len, 2), padded
+        after its path_len cells.
+    '''
+    paths = [path for r in routes for path in r]
+    path_len = np.array([len(path) for path in paths])
+    path_loc = np.zeros((len(paths), path_len.max(), 2), dtype=int)
+    for i, path in enumerate(paths):
+        path_loc[i, :len(path)] = path
+    return {'route_npath': np.array([len(r) for r in routes]), 'path_len': path_len, 'path_loc': path_loc}
+
+
+def route_lists(tables):
+    # the routes of compile_routes back as lists of paths, views of path_loc
+    routes, start = [], 0
+    for n in tables['route_npath']:
+        routes.append([tables['path_loc'][i, :tables['path_len'][i]] for i in range(start, start + n)])
+        start += n
+    return routes
+
+
+def route_key(dims, difficulty, vocab_type):
+    return 'routes_v{}_{}_{}x{}_{}'.format(ROUTE_CACHE_VERSION, difficulty, dims[0], dims[1], vocab_type)
+
+
+def load_route_tables(cache_dir, key):
+    '''
+    returns
+        - tables: the route tables of key built or loaded before by this
+        process, else read from cache_dir (memory mapped read-only), None if
+        they are in neither.
+    '''
+    if key in _route_tables:
+        return _route_tables[key]
+    if cache_dir is None:
+        return None
+    try:
+        tables = {field: np.load(os.path.join(cache_dir, key, field + '.npy'), mmap_mode='r')
+                  for field in ROUTE_FIELDS}
+    except FileNotFoundError:
+        return None
+    _route_tables[key] = tables
+    return tables
+
+
+def save_route_tables(cache_dir, key, tables):
+    '''
+    Keeps the tables for the next envs of this process and, with a cache_dir,
+    writes them under a hidden name renamed into place, so concurrent readers
+    never see a partial entry. An entry written meanwhile by another process
+    is kept.
+    '''
+    for field in ROUTE_FIELDS:
+        tables[field].flags.writeable = False
+    _route_tables[key] = tables
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = os.path.join(cache_dir, '.{}_{}'.format(key, os.getpid()))
+    os.makedirs(tmp, exist_ok=True)
+    for field in ROUTE_FIELDS:
+        np.save(os.path.join(tmp, field + '.npy'), tables[field])
+    try:
+        os.rename(tmp, os.path.join(cache_dir, key))
+    except OSError:
+        # lost the race to another process, the entries are the same
+        for field in ROUTE_FIELDS:
+            os.remove(os.path.join(tmp, field + '.npy'))
+        os.rmdir(tmp)
+
@@ -12,7 +12,11 @@ Design Decisions:
          -0.05 at each time step till the time
          -10 for each crash
     - Episode ends when all cars reach destination / max steps
-    - Obs. State:
+    - Paths are rows of one padded (npath, max_len, 2) array, so all cars
+      move, crash and enter with array ops; a crash is a road cell counted
+      twice by a bincount of the car cells.
+    - Obs. State: one row of floats per car in a buffer rewritten by each
+      step, the vision squares gathered from windows of the one-hot grid.
 """
 
 # core modules
@@ -25,6 +29,7 @@ import gym
 import numpy as np
 from gym import spaces
 from ic3net_envs.traffic_helper import *
+from ic3net_envs.env_state import EnvState
 
 
 def nPr(n,r):
@@ -46,6 +51,7 @@ class TrafficJunctionEnv(gym.Env):
 
         self.episode_over = False
         self.has_failed = 0
+        self.np_random = np.random.default_rng()
 
     def init_curses(self):
         self.stdscr = curses.initscr()
@@ -75,12 +81,14 @@ class TrafficJunctionEnv(gym.Env):
                          help="Difficulty level, easy|medium|hard")
         env.add_argument('--vocab_type', type=str, default='bool',
                          help="Type of location vector to use, bool|scalar")
+        env.add_argument('--route_cache', type=str, default=None,
+                         help="Directory to keep the route tables of each map in, shared by all processes")
 
 
     def multi_agent_init(self, args):
         # General variables defining the environment : CONFIG
         params = ['dim', 'vision', 'add_rate_min', 'add_rate_max', 'curr_start', 'curr_end',
-                  'difficulty', 'vocab_type']
+                  'difficulty', 'vocab_type', 'route_cache']
 
         for key in params:
             setattr(self, key, getattr(args, key))
@@ -132,28 +140,26 @@ class TrafficJunctionEnv(gym.Env):
             self.CAR_CLASS += self.BASE
             # car_type + base + outside + 0-index
             self.vocab_size = 1 + self.BASE + 1 + 1
-            self.observation_space = spaces.Tuple((
-                                    spaces.Discrete(self.naction),
-                                    spaces.Discrete(self.npath),
-                                    spaces.MultiBinary( (2*vision + 1, 2*vision + 1, self.vocab_size))))
+            # last_act, r_i then the vision square
+            self.obs_head = 2
         else:
             # r_i, (x,y), vocab = [road class + car]
             self.vocab_size = 1 + 1
+            # last_act, r_i, (x,y) then the vision square
+            self.obs_head = 4
 
-            # Observation for each agent will be 4-tuple of (r_i, last_act, len(dims), vision * vision * vocab)
-            self.observation_space = spaces.Tuple((
-                                    spaces.Discrete(self.naction),
-                                    spaces.Discrete(self.npath),
-                                    spaces.MultiDiscrete(dims),
-                                    spaces.MultiBinary( (2*vision + 1, 2*vision + 1, self.vocab_size))))
-            # Actual observation will be of the shape 1 * ncar * ((x,y) , (2v+1) * (2v+1) * vocab_size)
+        # Observation for each agent is a row of floats: obs_head values then
+        # the flattened (2v+1) * (2v+1) * vocab_size vision square
+        obs_dim = self.obs_head + (2*vision + 1) ** 2 * self.vocab_size
+        self.observation_space = spaces.Box(low=0, high=self.ncar, shape=(obs_dim,))
 
         self._set_grid()
 
-        if difficulty == 'easy':
-            self._set_paths_easy()
-        else:
-            self._set_paths(difficulty)
+        # Observations of all cars, rewritten in place by every _get_obs
+        self.obs = np.zeros((self.ncar, obs_dim))
+        self.vision_obs = self.obs[:, self.obs_head:].reshape(self.ncar, 2*vision + 1, 2*vision + 1, self.vocab_size)
+
+        self._set_path_arrays()
 
         return
 
@@ -172,10 +178,9 @@ class TrafficJunctionEnv(gym.Env):
         self.wait = np.zeros(self.ncar)
         self.cars_in_sys = 0
 
-        # Chosen path for each car:
-        self.chosen_path = [0] * self.ncar
+        # Chosen path for each car, a row of path_loc:
         # when dead => no route, must be masked by trainer.
-        self.route_id = [-1] * self.ncar
+        self.route_id = np.full(self.ncar, -1)
 
         # self.cars = np.zeros(self.ncar)
         # Current car to enter system
@@ -232,8 +237,9 @@ class TrafficJunctionEnv(gym.Env):
         # No one is completed before taking action
         self.is_completed = np.zeros(self.ncar)
 
-        for i, a in enumerate(action):
-            self._take_action(i, a)
+        # nothing moves on the steps with no car in the system
+        if self.cars_in_sys:
+            self._take_action(action)
 
         self._add_cars()
 
@@ -244,7 +250,8 @@ class TrafficJunctionEnv(gym.Env):
                 'alive_mask': np.copy(self.alive_mask),
                 'wait': self.wait,
                 'cars_in_sys': self.cars_in_sys,
-                'is_completed': np.copy(self.is_completed)}
+                'is_completed': np.copy(self.is_completed),
+                'action_mask': self.action_mask()}
 
         self.stat['success'] = 1 - self.has_failed
         self.stat['add_rate'] = self.add_rate
@@ -294,8 +301,56 @@ class TrafficJunctionEnv(gym.Env):
     def exit_render(self):
         curses.endwin()
 
-    def seed(self):
-        return
+    def snapshot(self):
+        # roads and the cars in the system for the episode recorder
+        return {'dims': self.dims,
+                'road_loc': np.argwhere(self.grid != self.OUTSIDE_CLASS),
+                'car_loc': self.car_loc[self.alive_mask == 1].copy()}
+
+    def seed(self, seed=None):
+        # cars enter, and pick their route, from this numpy Generator only
+        self.np_random = np.random.default_rng(seed)
+        return [seed]
+
+    def _state_arrays(self):
+        # the per car arrays, the paths are rows of path_loc
+        return {'alive_mask': self.alive_mask, 'wait': self.wait, 'car_loc': self.car_loc,
+                'car_last_act': self.car_last_act, 'car_route_loc': self.car_route_loc,
+                'route_id': self.route_id}
+
+    def get_state(self, state=None):
+        '''
+        Saves everything a step or a reset changes, curriculum included, to
+        go back to this point with set_state.
+        args
+            - state: an EnvState of this env to refill in place, a new one
+            is allocated if None.
+        returns
+            - state: EnvState
+        '''
+        objects = {'episode_over': self.episode_over, 'has_failed': self.has_failed,
+                   'cars_in_sys': self.cars_in_sys, 'stat': dict(self.stat),
+                   'add_rate': self.add_rate, 'exact_rate': self.exact_rate,
+                   'epoch_last_update': self.epoch_last_update,
+                   'np_random': self.np_random.bit_generator.state}
+        return EnvState.capture(state, self._state_arrays(), objects)
+
+    def set_state(self, state):
+        '''
+        Puts the env back to the point state was taken at, the state is left
+        as is and can be restored again.
+        returns
+            - obs: the observation of that point
+        '''
+        objects = state.load(self._state_arrays())
+        for key, value in objects.items():
+            if key == 'np_random':
+                self.np_random.bit_generator.state = value
+            elif key == 'stat':
+                setattr(self, key, value.copy())
+            else:
+                setattr(self, key, value)
+        return self._get_obs()
 
     def _set_grid(self):
         self.grid = np.full(self.dims[0] * self.dims[1], self.OUTSIDE_CLASS, dtype=int).reshape(self.dims)
@@ -316,81 +371,91 @@ class TrafficJunctionEnv(gym.Env):
         # Padding for vision
         self.pad_grid = np.pad(self.grid, self.vision, 'constant', constant_values = self.OUTSIDE_CLASS)
 
-        self.empty_bool_base_grid = self._onehot_initialization(self.pad_grid)
-
-    def _get_obs(self):
-        h, w = self.dims
-        self.bool_base_grid = self.empty_bool_base_grid.copy()
-
-        # Mark cars' location in Bool grid
-        for i, p in enumerate(self.car_loc):
-            self.bool_base_grid[p[0] + self.vision, p[1] + self.vision, self.CAR_CLASS] += 1
-
-
-        # remove the outside class.
+        # One-hot encoding of the padded grid, without the outside class for
+        # scalar vocab, and the number of cars on each of its cells.
+        self.bool_base_grid = self._onehot_initialization(self.pad_grid).astype(bool)
+        self.car_channel = self.CAR_CLASS
         if self.vocab_type == 'scalar':
-            self.bool_base_grid = self.bool_base_grid[:,:,1:]
+            self.bool_base_grid = np.ascontiguousarray(self.bool_base_grid[:, :, 1:])
+            self.car_channel -= 1
+        self.car_count = np.zeros(self.pad_grid.shape, dtype=int)
 
+        # Read only (h, w, 2v+1, 2v+1, ...) views of the windows of both, the
+        # vision square of a car at (y, x) is the window at [y, x].
+        size = 2 * self.vision + 1
+        self.base_windows = self._windows(self.bool_base_grid, size)
+        self.count_windows = self._windows(self.car_count, size)
 
-        obs = []
-        for i, p in enumerate(self.car_loc):
-            # most recent action
-            act = self.car_last_act[i] / (self.naction - 1)
+    def _get_obs(self):
+        h, w = self.dims
 
-            # route id
-            r_i = self.route_id[i] / (self.npath - 1)
+        # Count cars' location in padded grid
+        self.car_count.fill(0)
+        np.add.at(self.car_count, (self.car_loc[:, 0] + self.vision, self.car_loc[:, 1] + self.vision), 1)
 
-            # loc
-            p_norm = p / (h-1, w-1)
+        obs = self.obs
+        # most recent action
+        obs[:, 0] = self.car_last_act / (self.naction - 1)
 
-            # vision square
-            slice_y = slice(p[0], p[0] + (2 * self.vision) + 1)
-            slice_x = slice(p[1], p[1] + (2 * self.vision) + 1)
-            v_sq = self.bool_base_grid[slice_y, slice_x]
+        # route id
+        obs[:, 1] = self.route_id / (self.npath - 1)
 
-            # when dead, all obs are 0. But should be masked by trainer.
-            if self.alive_mask[i] == 0:
-                act = np.zeros_like(act)
-                r_i = np.zeros_like(r_i)
-                p_norm = np.zeros_like(p_norm)
-                v_sq = np.zeros_like(v_sq)
+        # loc
+        if self.vocab_type == 'scalar':
+            obs[:, 2:4] = self.car_loc / (h-1, w-1)
 
-            if self.vocab_type == 'bool':
-                o = tuple((act, r_i, v_sq))
-            else:
-                o = tuple((act, r_i, p_norm, v_sq))
-            obs.append(o)
+        # vision squares of all cars in one gather of the windows
+        y, x = self.car_loc[:, 0], self.car_loc[:, 1]
+        self.vision_obs[:] = self.base_windows[y, x]
+        self.vision_obs[..., self.car_channel] += self.count_windows[y, x]
 
-        obs = tuple(obs)
+        # when dead, all obs are 0. But should be masked by trainer.
+        obs[self.alive_mask == 0] = 0
 
         return obs
 
 
     def _add_cars(self):
-        for r_i, routes in enumerate(self.routes):
-            if self.cars_in_sys >= self.ncar:
-                return
+        # whether a car enters on each route, and on which of its paths, in one draw per step
+        enter = self.np_random.random(len(self.route_npath)) <= self.add_rate
+        paths = self.np_random.integers(self.route_npath)
 
-            # Add car to system and set on path
-            if np.random.uniform() <= self.add_rate:
+        # the first routes in order while there are cars left
+        routes = np.flatnonzero(enter)[:self.ncar - self.cars_in_sys]
+        if not routes.size:
+            return
+
+        # distinct dead cars chosen at random, one per entering route
+        idx = self.np_random.choice(np.flatnonzero(self.alive_mask == 0), routes.size, replace=False)
+        self.alive_mask[idx] = 1
 
-                # chose dead car on random
-                idx = self._choose_dead()
-                # make it alive
-                self.alive_mask[idx] = 1
+        # make sure all self.routes have equal len/ same no. of routes
+        self.route_id[idx] = paths[routes] + routes * self.route_npath[routes]
 
-                # choose path randomly & set it
-                p_i = np.random.choice(len(routes))
-                # make sure all self.routes have equal len/ same no. of routes
-                self.route_id[idx] = p_i + r_i * len(routes)
-                self.chosen_path[idx] = routes[p_i]
+        # set its start loc
+        self.car_route_loc[idx] = 0
+        self.car_loc[idx] = self.path_loc[self.route_id[idx], 0]
 
-                # set its start loc
-                self.car_route_loc[idx] = 0
-                self.car_loc[idx] = routes[p_i][0]
+        # increase count
+        self.cars_in_sys += routes.size
 
-                # increase count
-                self.cars_in_sys += 1
+    def _set_path_arrays(self):
+        # the paths are only searched for maps no env of this process or of
+        # the route cache has seen, see traffic_helper.compile_routes
+        key = route_key(self.dims, self.difficulty, self.vocab_type)
+        tables = load_route_tables(self.route_cache, key)
+        if tables is None:
+            if self.difficulty == 'easy':
+                self._set_paths_easy()
+            else:
+                self._set_paths(self.difficulty)
+            tables = compile_routes(self.routes)
+            save_route_tables(self.route_cache, key, tables)
+        else:
+            self.routes = route_lists(tables)
+        self.route_npath = tables['route_npath']
+        self.path_len = tables['path_len']
+        self.path_loc = tables['path_loc']
 
     def _set_paths_easy(self):
         h, w = self.dims
@@ -537,63 +602,74 @@ class TrafficJunctionEnv(gym.Env):
         return True
 
 
-    def _take_action(self, idx, act):
-        # non-active car
-        if self.alive_mask[idx] == 0:
-            return
+    def _take_action(self, action):
+        # only active cars act
+        alive = self.alive_mask == 1
 
         # add wait time for active cars
-        self.wait[idx] += 1
+        self.wait[alive] += 1
 
         # action BRAKE i.e STAY
-        if act == 1:
-            self.car_last_act[idx] = 1
-            return
+        self.car_last_act[alive & (action == 1)] = 1
 
         # GAS or move
-        if act==0:
-            prev = self.car_route_loc[idx]
-            self.car_route_loc[idx] += 1
-            curr = self.car_route_loc[idx]
-
-            # car/agent has reached end of its path
-            if curr == len(self.chosen_path[idx]):
-                self.cars_in_sys -= 1
-                self.alive_mask[idx] = 0
-                self.wait[idx] = 0
-
-                # put it at dead loc
-                self.car_loc[idx] = np.zeros(len(self.dims),dtype=int)
-                self.is_completed[idx] = 1
-                return
-
-            elif curr > len(self.chosen_path[idx]):
-                print(curr)
-                raise RuntimeError("Out of boud car path")
-
-            prev = self.chosen_path[idx][prev]
-            curr = self.chosen_path[idx][curr]
-
-            # assert abs(curr[0] - prev[0]) + abs(curr[1] - prev[1]) == 1 or curr_path = 0
-            self.car_loc[idx] = curr
-
-            # Change last act for color:
-            self.car_last_act[idx] = 0
-
-
+        gas = np.flatnonzero(alive & (action == 0))
+        self.car_route_loc[gas] += 1
+        curr = self.car_route_loc[gas]
+        path = self.route_id[gas]
+        if np.any(curr > self.path_len[path]):
+            raise RuntimeError("Out of boud car path")
+
+        # car/agent has reached end of its path
+        end = curr == self.path_len[path]
+        done = gas[end]
+        self.cars_in_sys -= done.size
+        self.alive_mask[done] = 0
+        self.wait[done] = 0
+
+        # put it at dead loc
+        self.car_loc[done] = 0
+        self.is_completed[done] = 1
+
+        move = gas[~end]
+        self.car_loc[move] = self.path_loc[path[~end], curr[~end]]
+
+        # Change last act for color:
+        self.car_last_act[move] = 0
+
+
+    def action_mask(self):
+        '''
+        returns
+            - mask: bool array (ncar, naction), GAS and BRAKE are both legal
+            for the cars in the system, the cars outside only BRAKE so they
+            sample a fixed action and add no noise to the policy gradient.
+        '''
+        mask = np.ones((self.ncar, self.naction), dtype=bool)
+        mask[self.alive_mask == 0, 0] = False
+        return mask
 
     def _get_reward(self):
         reward = np.full(self.ncar, self.TIMESTEP_PENALTY) * self.wait
 
-        for i, l in enumerate(self.car_loc):
-            if (len(np.where(np.all(self.car_loc[:i] == l,axis=1))[0]) or \
-               len(np.where(np.all(self.car_loc[i+1:] == l,axis=1))[0])) and l.any():
-               reward[i] += self.CRASH_PENALTY
-               self.has_failed = 1
+        if self.cars_in_sys:
+            # cars sharing a cell crash, cell 0 is where the dead cars are
+            cell = self.car_loc[:, 0] * self.dims[1] + self.car_loc[:, 1]
+            crash = (np.bincount(cell, minlength=self.dims[0] * self.dims[1])[cell] > 1) & (cell > 0)
+            if crash.any():
+                reward[crash] += self.CRASH_PENALTY
+                self.has_failed = 1
 
         reward = self.alive_mask * reward
         return reward
 
+    def _windows(self, a, size):
+        # the size x size windows of a along its first two axes, the window
+        # axes before the remaining ones
+        h, w = a.shape[0] - size + 1, a.shape[1] - size + 1
+        return np.lib.stride_tricks.as_strided(a, shape=(h, w, size, size) + a.shape[2:],
+                                               strides=a.strides[:2] * 2 + a.strides[2:], writeable=False)
+
     def _onehot_initialization(self, a):
         if self.vocab_type == 'bool':
             ncols = self.vocab_size
@@ -611,12 +687,6 @@ class TrafficJunctionEnv(gym.Env):
     def reward_terminal(self):
         return np.zeros_like(self._get_reward())
 
-    def _choose_dead(self):
-        # all idx
-        car_idx = np.arange(len(self.alive_mask))
-        # random choice of idx from dead ones.
-        return np.random.choice(car_idx[self.alive_mask == 0])
-
     def curriculum(self, epoch):
         step_size = 0.01
         step = (self.add_rate_max - self.add_rate_min) / (self.curr_end - self.curr_start)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Simulate a batch of independent predator prey episodes at once.
+
+Every episode follows the rules of PredatorPreyEnv, but the state of all B
+episodes is kept in stacked arrays and each phase (moves, reward, observation,
+reset) is a single NumPy call over the whole batch.
+
+Design Decisions:
+    - predator_loc: B x npredator x 2, prey_loc: B x nprey x 2
+    - obstacle occupancy: B x (dim + 2) x (dim + 2), the border marks the
+      outside of the map so that bound and obstacle checks are one lookup
+    - reached_prey: B x npredator
+    - Finished episodes (all predators on prey in mixed mode, or max_steps
+      reached) are reset in place, the returned obs is the one of the new
+      episode.
+    - Obs. State: B x npredator x 4 x dim x dim, same channels as PredatorPreyEnv
+"""
+
+# core modules
+import curses
+
+# 3rd party modules
+import gym
+import numpy as np
+from gym import spaces
+from ic3net_envs.predator_prey_helper import MOVES, MAX_SPAWN_TRIES, sample_spawn_batch
+
+
+class VecPredatorPrey(gym.Env):
+    # metadata = {'render.modes': ['human']}
+
+    def __init__(self,):
+        self.__version__ = "0.0.1"
+
+        self.TIMESTEP_PENALTY = -0.05
+        self.PREY_REWARD = 0
+        self.POS_PREY_REWARD = 0.05
+        self.map_dim = 4
+        self.ppweight = 2
+        self.np_random = np.random.default_rng()
+
+    def init_curses(self):
+        self.stdscr = curses.initscr()
+        curses.start_color()
+        curses.use_default_colors()
+        curses.init_pair(1, curses.COLOR_RED, -1)
+        curses.init_pair(2, curses.COLOR_YELLOW, -1)
+        curses.init_pair(3, curses.COLOR_CYAN, -1)
+        curses.init_pair(4, curses.COLOR_GREEN, -1)
+
+    def init_args(self, parser):
+        env = parser.add_argument_group('Vectorized Prey Predator task')
+        env.add_argument('--nenvs', type=int, default=64,
+                         help="Number of episodes stepped together")
+        env.add_argument('--nenemies', type=int, default=1,
+                         help="Total number of preys in play")
+        env.add_argument('--dim', type=int, default=5,
+                         help="Dimension of box")
+        env.add_argument('--vision', type=int, default=2,
+                         help="Vision of predator")
+        env.add_argument('--moving_prey', action="store_true", default=False,
+                         help="Whether prey is fixed or moving")
+        env.add_argument('--no_stay', action="store_true", default=False,
+                         help="Whether predators have an action to stay in place")
+        parser.add_argument('--mode', default='mixed', type=str,
+                        help='cooperative|competitive|mixed (default: mixed)')
+        env.add_argument('--enemy_comm', action="store_true", default=False,
+                         help="Whether prey can communicate.")
+
+    def multi_agent_init(self, args):
+
+        # General variables defining the environment : CONFIG
+        params = ['dim', 'vision', 'moving_prey', 'mode', 'enemy_comm', 'nenvs']
+        for key in params:
+            setattr(self, key, getattr(args, key))
+
+        self.nprey = args.nenemies
+        self.npredator = args.nfriendly
+        self.dims = dims = (self.dim, self.dim)
+        self.stay = not args.no_stay
+        self.ngrid = args.obstacles
+        self.max_steps = args.max_steps
+
+        if args.moving_prey:
+            raise NotImplementedError
+
+        if self.stay:
+            self.naction = 5
+        else:
+            self.naction = 4
+
+        self.action_space = spaces.MultiDiscrete([self.naction])
+        self.observation_space = spaces.Box(low=0, high=1, shape=(4, self.dim, self.dim), dtype=int)
+        # Actual observation will be of the shape nenvs * npredator * 4 * dim * dim
+
+        B = self.nenvs
+        self.predator_loc = np.zeros((B, self.npredator, 2), dtype=int)
+        self.prey_loc = np.zeros((B, self.nprey, 2), dtype=int)
+        self.grid_loc = np.zeros((B, self.ngrid, 2), dtype=int)
+        self.occupancy = np.ones((B, dims[0] + 2, dims[1] + 2), dtype=bool)
+        self.reached_prey = np.zeros((B, self.npredator))
+        self.episode_over = np.zeros(B, dtype=bool)
+        self.steps = np.zeros(B, dtype=int)
+        self.comm = np.zeros((B, self.npredator))
+        self.true = np.zeros((B, self.map_dim, dims[0], dims[1]))
+        self.stat = dict()
+        return
+
+    def step(self, action):
+        """
+        All B episodes take a step in the environment.
+
+        Parameters
+        ----------
+        action : pair (moves, comm), moves is a nenvs x npredator array of
+                 action indexes in [0, naction).
+
+        Returns
+        -------
+        obs, reward, done, info : tuple
+            obs (ndarray) : nenvs x npredator x 4 x dim x dim, for the envs that
+                just finished this is the first obs of their new episode.
+            reward (ndarray) : nenvs x n, rewards of the step just taken.
+            done (ndarray) : nenvs bools, true where an episode finished.
+            info (dict) : locations before the auto-reset, success flags and
+                the action_mask of the returned obs.
+        """
+        self.comm = action[1]
+        action = np.asarray(action[0]).reshape(self.nenvs, -1)[:, :self.npredator]
+        assert np.all(action < self.naction), "Actions should be in the range [0,naction)."
+
+        self._take_action(action)
+        reward = self._get_reward()
+        self.steps += 1
+
+        done = self.episode_over | (self.steps >= self.max_steps)
+        success = self.stat['success'].copy()
+        info = {'predator_locs': self.predator_loc.copy(),
+                'prey_locs': self.prey_loc.copy(),
+                'success': success}
+
+        finished = np.flatnonzero(done)
+        if finished.size:
+            self.stat['num_episodes'] = self.stat.get('num_episodes', 0) + finished.size
+            self.stat['episode_success'] = self.stat.get('episode_success', 0) + success[finished].sum()
+            self._reset_envs(finished)
+
+        self.obs = self._get_obs()
+        info['action_mask'] = self.action_mask()
+        return self.obs, reward, done, info
+
+    def reset(self):
+        """
+        Reset all B episodes and returns the initial observations.
+
+        Returns
+        -------
+        observation (ndarray): nenvs x npredator x 4 x dim x dim
+        """
+        self.stat = dict()
+        self._reset_envs(np.arange(self.nenvs))
+        self.obs = self._get_obs()
+        return self.obs
+
+    def seed(self, seed=None):
+        # one numpy Generator draws the layouts of all the episodes of the batch
+        self.np_random = np.random.default_rng(seed)
+        return [seed]
+
+    def _reset_envs(self, envs):
+        # Draw the obstacles, then predators and preys from one connected
+        # component of the free cells, redrawing the layouts without room.
+        n_ent = self.npredator + self.nprey
+        todo = envs
+        for _ in range(MAX_SPAWN_TRIES):
+            keys = self.np_random.random((todo.size, np.prod(self.dims)))
+            idx = np.argsort(keys, axis=1)[:, :self.ngrid]
+            grid_loc = np.stack(np.unravel_index(idx, self.dims), axis=-1)
+
+            occ = np.zeros((todo.size, self.dims[0] + 2, self.dims[1] + 2), dtype=bool)
+            occ[:, [0, -1], :] = True
+            occ[:, :, [0, -1]] = True
+            rows = np.arange(todo.size)[:, None]
+            occ[rows, grid_loc[..., 0] + 1, grid_loc[..., 1] + 1] = True
+
+            locs, ok = sample_spawn_batch(occ, n_ent, self.np_random)
+            done = todo[ok]
+            self.predator_loc[done] = locs[ok, :self.npredator]
+            self.prey_loc[done] = locs[ok, self.npredator:]
+            self.grid_loc[done] = grid_loc[ok]
+            self.occupancy[done] = occ[ok]
+            todo = todo[~ok]
+            if not todo.size:
+                break
+        else:
+            raise RuntimeError("No room for {} predators and preys between {} obstacles on a {}x{} map".format(
+                n_ent, self.ngrid, self.dims[0], self.dims[1]))
+
+        self.reached_prey[envs] = 0
+        self.episode_over[envs] = False
+        self.steps[envs] = 0
+
+    def _take_action(self, action):
+        # A move is taken when its target is inside the map and not an
+        # obstacle, predators which reached the prey no longer move.
+        target = self.predator_loc + MOVES[action]
+        rows = np.arange(self.nenvs)[:, None]
+        free = ~self.occupancy[rows, target[..., 0] + 1, target[..., 1] + 1]
+        move = free & (self.reached_prey == 0)
+        self.predator_loc = np.where(move[..., None], target, self.predator_loc)
+
+    def action_mask(self):
+        '''
+        returns
+            - mask: bool array (nenvs, n, naction) of the moves _take_action
+            would carry out, see predator_prey_helper.legal_moves.
+        '''
+        target = self.predator_loc[:, :, None, :] + MOVES[:self.naction]
+        rows = np.arange(self.nenvs)[:, None, None]
+        mask = ~self.occupancy[rows, target[..., 0] + 1, target[..., 1] + 1]
+        mask[self.reached_prey == 1] = np.arange(self.naction) == 4
+        mask[~mask.any(axis=2)] = True
+        if self.enemy_comm:
+            mask = np.concatenate((mask, np.ones((self.nenvs, self.nprey, self.naction), dtype=bool)), axis=1)
+        return mask
+
+    def _get_reward(self):
+        n = self.npredator if not self.enemy_comm else self.npredator + self.nprey
+        reward = np.full((self.nenvs, n), self.TIMESTEP_PENALTY)
+
+        on_prey = (self.predator_loc[:, :, None, :] == self.prey_loc[:, None, :, :]).all(axis=3).any(axis=2)
+        nb_predator_on_prey = on_prey.sum(axis=1)
+        count = nb_predator_on_prey[:, None]
+
+        predator_reward = reward[:, :self.npredator]
+        if self.mode == 'cooperative':
+            np.putmask(predator_reward, on_prey, np.broadcast_to(self.POS_PREY_REWARD * count, on_prey.shape))
+        elif self.mode == 'competitive':
+            np.putmask(predator_reward, on_prey,
+                       np.broadcast_to(self.POS_PREY_REWARD / np.maximum(count, 1), on_prey.shape))
+        elif self.mode == 'mixed':
+            predator_reward[on_prey] = self.PREY_REWARD
+        else:
+            raise RuntimeError("Incorrect mode, Available modes: [cooperative|competitive|mixed]")
+
+        self.reached_prey[on_prey] = 1
+
+        if self.mode == 'mixed':
+            self.episode_over = np.all(self.reached_prey == 1, axis=1)
+
+        # Prey reward
+        reward[:, self.npredator:] = np.where(count == 0, -1 * self.TIMESTEP_PENALTY, 0)
+
+        # Success ratio
+        if self.mode != 'competitive':
+            self.stat['success'] = (nb_predator_on_prey == self.npredator).astype(int)
+        else:
+            self.stat['success'] = np.zeros(self.nenvs, dtype=int)
+
+        return reward
+
+    def reward_terminal(self):
+        return np.zeros((self.nenvs, self.npredator if not self.enemy_comm else self.npredator + self.nprey))
+
+    def _get_obs(self):
+        B = self.nenvs
+        rows = np.arange(B)[:, None]
+        self.true.fill(0)
+        self.true[rows, 0, self.predator_loc[..., 0], self.predator_loc[..., 1]] = self.ppweight
+        self.true[rows, 1, self.prey_loc[..., 0], self.prey_loc[..., 1]] = 2
+        self.true[rows, 3, self.grid_loc[..., 0], self.grid_loc[..., 1]] = 2
+
+        # Vision square of each agent as the outer product of a row and a column band
+        ax = np.arange(self.dim)
+        in_rows = np.abs(ax - self.predator_loc[..., 0, None]) <= self.vision
+        in_cols = np.abs(ax - self.predator_loc[..., 1, None]) <= self.vision
+        window = in_rows[..., :, None] & in_cols[..., None, :]
+
+        # union of the vision squares of all agents
+        self.true[:, 2] = window.any(axis=1)
+
+        obs = self.true[:, None] * window[:, :, None]
+        obs[:, :, 2] = window
+        return obs
+
+    def render(self, mode='human', close=False):
+        # Only the first episode of the batch is drawn.
+        grid = np.zeros(np.prod(self.dims), dtype=object).reshape(self.dims)
+        self.stdscr.clear()
+
+        for p in self.predator_loc[0]:
+            if grid[p[0]][p[1]] != 0:
+                grid[p[0]][p[1]] = str(grid[p[0]][p[1]]) + 'X'
+            else:
+                grid[p[0]][p[1]] = 'X'
+
+        for p in self.prey_loc[0]:
+            if grid[p[0]][p[1]] != 0:
+                grid[p[0]][p[1]] = str(grid[p[0]][p[1]]) + 'P'
+            else:
+                grid[p[0]][p[1]] = 'P'
+
+        for row_num, row in enumerate(grid):
+            for idx, item in enumerate(row):
+                if item != 0:
+                    if 'X' in item and 'P' in item:
+                        self.stdscr.addstr(row_num, idx * 4, item.center(3), curses.color_pair(3))
+                    elif 'X' in item:
+                        self.stdscr.addstr(row_num, idx * 4, item.center(3), curses.color_pair(1))
+                    else:
+                        self.stdscr.addstr(row_num, idx * 4, item.center(3),  curses.color_pair(2))
+                else:
+                    self.stdscr.addstr(row_num, idx * 4, '0'.center(3), curses.color_pair(4))
+
+        self.stdscr.addstr(len(grid), 0, '\n')
+        self.stdscr.refresh()
+
+    def snapshot(self):
+        # Only the first episode of the batch is recorded.
+        return {'dims': self.dims,
+                'predator_loc': self.predator_loc[0].copy(),
+                'prey_loc': self.prey_loc[0].copy(),
+                'grid_loc': self.grid_loc[0].copy()}
+
+    def exit_render(self):
+        curses.endwin()
@@ -0,0 +1,80 @@
+"""
+The compiled steps of PredatorPreyEnv (--numba) against its NumPy path: both
+envs are seeded alike and fed the same actions, their trajectories must be
+identical, action masks included.
+"""
+
+import argparse
+
+import numpy as np
+import pytest
+
+pytest.importorskip('numba')
+
+from ic3net_envs import predator_prey_env, predator_prey_env_moving_prey, predator_prey_env_moving_mase
+
+MODES = ['cooperative', 'competitive', 'mixed']
+
+# variant name: env class and its args
+VARIANTS = {
+    'plain': (predator_prey_env.PredatorPreyEnv, dict(obstacles=0)),
+    'moving_prey': (predator_prey_env_moving_prey.PredatorPreyEnv, dict(obstacles=0, moving_prey=True, nenemies=3)),
+    'obstacles': (predator_prey_env.PredatorPreyEnv, dict(obstacles=15)),
+    'walls': (predator_prey_env_moving_mase.PredatorPreyEnv, dict(obstacles=6, dim=7)),
+}
+
+
+def make_env(cls, mode, compiled, **kwargs):
+    args = argparse.Namespace(nenemies=1, nfriendly=4, dim=10, vision=1, moving_prey=False, no_stay=False,
+                              mode=mode, enemy_comm=False, obstacles=0, scenario_bank=None, large_map=False,
+                              obs_type='map', numba=compiled)
+    for key, value in kwargs.items():
+        setattr(args, key, value)
+    env = cls()
+    env.multi_agent_init(args)
+    assert env.compiled == compiled
+    return env
+
+
+def trajectory(env, seed, episodes=5, steps=30):
+    env.seed(seed)
+    rng = np.random.default_rng(seed)
+    out = []
+    for _ in range(episodes):
+        out.append(np.array(env.reset(), copy=True))
+        for _ in range(steps):
+            action = rng.integers(env.naction, size=env.npredator)
+            obs, reward, done, info = env.step([action, np.zeros(env.npredator)])
+            out.append((np.array(obs, copy=True), np.array(reward), done, info['action_mask']))
+            if done:
+                break
+    return out
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_predators_on_prey_only_stay(compiled):
+    env = make_env(predator_prey_env.PredatorPreyEnv, 'cooperative', compiled, obstacles=0)
+    env.seed(3)
+    env.reset()
+    env.predator_loc[0] = env.prey_loc[0]
+    env.reached_prey[0] = 1
+    mask = env.action_mask()
+    assert mask[0].tolist() == [False, False, False, False, True]
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_compiled_steps_match_numpy(variant, mode):
+    cls, kwargs = VARIANTS[variant]
+    reference = trajectory(make_env(cls, mode, False, **kwargs), seed=7)
+    compiled = trajectory(make_env(cls, mode, True, **kwargs), seed=7)
+
+    assert len(reference) == len(compiled)
+    for ref, out in zip(reference, compiled):
+        if isinstance(ref, tuple):
+            np.testing.assert_array_equal(ref[0], out[0])
+            np.testing.assert_array_equal(ref[1], out[1])
+            assert ref[2] == out[2]
+            np.testing.assert_array_equal(ref[3], out[3])
+        else:
+            np.testing.assert_array_equal(ref, out)
@@ -74,6 +74,8 @@ parser.add_argument('--load', default='', type=str,
                     help='load the model')
 parser.add_argument('--display', action="store_true", default=False,
                     help='Display environment state')
+parser.add_argument('--record_episodes', default='', type=str,
+                    help='With --display, record the displayed episodes to this file instead of drawing them')
 
 
 parser.add_argument('--random', action='store_true', default=False,
@@ -212,6 +214,7 @@ if args.nprocesses > 1:
     trainer = MultiProcessTrainer(args, lambda: Trainer(args, policy_net, data.init(args.env_name, args)))
 else:
     trainer = Trainer(args, policy_net, data.init(args.env_name, args), wocomm_baseline)
+    trainer.env.seed(args.seed)
 
 disp_trainer = Trainer(args, policy_net, data.init(args.env_name, args, False))
 disp_trainer.display = True
@@ -15,6 +15,7 @@ class ThreadedWorker(mp.Process):
     def run(self):
         torch.manual_seed(self.seed + self.id + 1)
         np.random.seed(self.seed + self.id + 1)
+        self.trainer.env.seed(self.seed + self.id + 1)
 
         while True:
             task = self.comm.recv()
@@ -42,6 +43,7 @@ class ThreadedTrainer(object):
     def __init__(self, args, trainer_maker):
         self.comms = []
         self.trainer = trainer_maker()
+        self.trainer.env.seed(args.seed)
         # itself will do the same job as workers
         self.nworkers = args.nthreads - 1
         for i in range(self.nworkers):
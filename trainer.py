@@ -145,6 +145,11 @@ class Trainer(object):
             state = self.env.reset(epoch)
         else:
             state = self.env.reset()
+        # the graphs and their ground truth are built from the (n, 2) predator
+        # and prey locations of one episode, set by the reset of the env
+        predator_loc = getattr(self.env.env, 'predator_loc', None)
+        if predator_loc is None or np.ndim(predator_loc) != 2:
+            raise RuntimeError("Trainer needs an unbatched predator prey env, got " + type(self.env.env).__name__)
         should_display = self.display and self.last_step
 
         if should_display:
@@ -154,11 +159,17 @@ class Trainer(object):
         switch_t = -1
 
         prev_hid = torch.zeros(1, self.args.nagents, self.args.hid_size)
-        obs_layer = np.zeros([ self.env.env.true.shape[1], self.env.env.true.shape[2]])
+        # large maps keep the seen cells in env.visited instead of a map
+        large_map = getattr(self.args, 'large_map', False)
+        if not large_map:
+            obs_layer = np.zeros([ self.env.env.true.shape[1], self.env.env.true.shape[2]])
         for t in range(self.args.max_steps):
             misc = dict()
             if t == 0 and self.args.hard_attn and self.args.commnet:
                 info['comm_action'] = np.zeros(self.args.nagents, dtype=int)
+            if t == 0:
+                # later masks come with the info of each step
+                info['action_mask'] = self.env.action_mask()
 
             # recurrence over time
             if self.args.recurrent:
@@ -183,16 +194,17 @@ class Trainer(object):
                 x = state
                 action_out, value ,value_global = self.policy_net(x, info)
 
-            action = select_action(self.args, action_out)
+            action = select_action(self.args, action_out, info.get('action_mask'))
             action, actual = translate_action(self.args, self.env, action)
 
             node_decoded = node_decoded.view(self.args.nagents, self.args.nagents+1, (4)) # +9   +2 +self.args.nagents+1+1
             edge_decoded = edge_decoded.view(self.args.nagents, self.args.nagents+1, self.args.nagents+1) #+self.env.env.ngrid
             
             node_gt, edge_gt, location = self.ground_truth_gen(self.env.env)
-            obs_layer = obs_layer + self.env.env.true[2, :, :]
-            obs_layer[obs_layer > 0] = 1
-            self.env.env.true[2, :, :] = obs_layer
+            if not large_map:
+                obs_layer = obs_layer + self.env.env.true[2, :, :]
+                obs_layer[obs_layer > 0] = 1
+                self.env.env.true[2, :, :] = obs_layer
             
             
             node_ground_truthg = torch.tensor(node_gt[np.newaxis].repeat(self.args.nagents, axis=0))
@@ -203,7 +215,7 @@ class Trainer(object):
             #edge_maploss = Loss_func(edge_decoded, edge_ground_truthg.detach())
             
             next_state, reward, done, info = self.env.step(actual)
-            next_state = next_state.squeeze().view(1, self.args.nagents, 4, self.args.dim, self.args.dim)
+            next_state = next_state.squeeze().view(1, self.args.nagents, *self.env.observation_shape)
             # store comm_action in info for next step
             if self.args.hard_attn and self.args.commnet:
                 info['comm_action'] = action[-1] if not self.args.comm_action_one else np.ones(self.args.nagents, dtype=int)
@@ -243,7 +255,7 @@ class Trainer(object):
                     episode_mini_mask = 1 - info['is_completed'].reshape(-1)
 
             if should_display:
-                self.env.display()
+                self.env.display(info.get('comm_action'), reward)
 
 
             trans = Transition(state, action, action_out, value, value_global, episode_mask, episode_mini_mask, next_state, reward, misc, node_ground_truthg, edge_ground_truthg, location, node_decoded, edge_decoded,
@@ -503,7 +515,10 @@ class Trainer(object):
 
 
 #####  heuristic for Predator Prey
-    def chasing_prey(self, node):
-        for i in range(node.shape[0]):
-            if node[i].sum()<=0:
-                a=1
+    def chasing_prey(self, env):
+        # scripted predators following BFS distance fields to the preys,
+        # returns the action of every predator of env
+        if not hasattr(self, 'expert'):
+            from ic3net_envs.predator_prey_expert import BFSExpert
+            self.expert = BFSExpert()
+        return self.expert.act(env)
@@ -112,6 +112,13 @@ def init_args_for_env(parser):
         'levers': 'Levers-v0',
         'number_pairs': 'NumberPairs-v0',
         'predator_prey': 'PredatorPrey-v0',
+        'predator_prey_basic_obstacle': 'PredatorPreyBasicObstacle-v0',
+        'predator_prey_nomask': 'PredatorPreyNoMask-v0',
+        'predator_prey_norml': 'PredatorPreyNorml-v0',
+        'predator_prey_moving_prey': 'PredatorPreyMovingPrey-v0',
+        'predator_prey_moving_mase': 'PredatorPreyMovingMase-v0',
+        'predator_prey_lastusage': 'PredatorPreyLastUsage-v0',
+        'vec_predator_prey': 'VecPredatorPrey-v0',
         'traffic_junction': 'TrafficJunction-v0',
         'starcraft': 'StarCraftWrapper-v0'
     }